@@ -4,3 +4,8 @@ from .dpclus import DPCLUS
 from .ipca import IPCA
 from .coach import COACH
 
+ALGORITHMS = {"MCODE": MCODE, "DPCLUS": DPCLUS, "IPCA": IPCA, "COACH": COACH}
+
+from .graph import Graph
+from .instrument import Instrument
+from .results import ClusterSet
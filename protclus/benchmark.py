@@ -0,0 +1,252 @@
+# Benchmark suite for the clustering algorithms
+# Generates synthetic PPI-like networks, times and memory profiles every
+# algorithm per stage and compares reports against a stored baseline
+
+# Author: Paul Scherer
+# MIT LICENSE
+
+import argparse
+import contextlib
+import csv
+import io
+import json
+import os
+import platform
+import tempfile
+import tracemalloc
+from collections import defaultdict
+
+import numpy as np
+
+from . import ALGORITHMS
+from .graph import Graph
+from .instrument import Instrument
+
+FIELDS = ["algorithm", "n_edges", "n_nodes", "stage", "seconds", "peak_mb"]
+
+
+def synthetic_ppi(n_edges, avg_degree=10, gamma=2.5, complex_fraction=0.2,
+                  complex_sizes=(3, 20), complex_density=0.9, seed=0):
+    """Random PPI-like network with about ``n_edges`` interactions.
+
+    Background interactions follow a Chung-Lu model with power-law expected degrees
+    (exponent ``gamma``), so the degree distribution is scale-free. On top of it,
+    dense complexes of random sizes in ``complex_sizes`` are planted, each pair of
+    members interacting with probability ``complex_density``, until they make up
+    ``complex_fraction`` of the edges. Returns the graph and the planted complexes
+    as sets of protein names. The same seed always gives the same network.
+
+    """
+    rng = np.random.RandomState(seed)
+    n = max(complex_sizes[1], int(round(2. * n_edges / avg_degree)))
+    names = ["P%07d" % i for i in range(n)]
+
+    # planted complexes
+    complexes, keys = [], []
+    n_complex_edges = 0
+    while n_complex_edges < complex_fraction * n_edges:
+        size = rng.randint(complex_sizes[0], complex_sizes[1] + 1)
+        members = np.sort(rng.choice(n, size, replace=False))
+        a, b = np.triu_indices(size, 1)
+        keep = rng.random_sample(len(a)) < complex_density
+        keys.append(members[a[keep]].astype(np.int64) * n + members[b[keep]])
+        n_complex_edges += int(keep.sum())
+        complexes.append(set(names[i] for i in members))
+    keys = np.unique(np.concatenate(keys)) if keys else np.zeros(0, dtype=np.int64)
+
+    # scale-free background, topped up until enough distinct edges exist
+    weights = (np.arange(n) + 1.) ** (-1. / (gamma - 1))
+    p = weights / weights.sum()
+    while len(keys) < n_edges:
+        missing = n_edges - len(keys)
+        a = rng.choice(n, missing + missing // 10 + 10, p=p)
+        b = rng.choice(n, len(a), p=p)
+        new = np.minimum(a, b).astype(np.int64) * n + np.maximum(a, b)
+        new = new[a != b]
+        new = new[~np.isin(new, keys)]
+        _, first = np.unique(new, return_index=True)
+        keys = np.concatenate([keys, new[np.sort(first)][:missing]])
+
+    # shuffle the interaction order, and the direction of every interaction
+    keys = keys[rng.permutation(len(keys))]
+    sources, targets = keys // n, keys % n
+    swap = rng.random_sample(len(keys)) < 0.5
+    sources[swap], targets[swap] = targets[swap], sources[swap]
+
+    # only keep the names of proteins that interact, in order of appearance
+    order = np.column_stack([sources, targets]).ravel()
+    _, first = np.unique(order, return_index=True)
+    used = order[np.sort(first)]
+    relabel = np.empty(n, dtype=np.int64)
+    relabel[used] = np.arange(len(used))
+    graph = Graph.from_arrays([names[i] for i in used], relabel[sources], relabel[targets])
+    return graph, complexes
+
+
+class _TracingInstrument(Instrument):
+    """Instrument that also traces the peak memory allocated during every stage.
+    Tracing slows Python code down, so runs with it are never timed"""
+
+    def reset(self):
+        super(_TracingInstrument, self).reset()
+        self.peaks = defaultdict(float) # stage => peak MB of a single pass
+
+    def start(self, name):
+        tracemalloc.start()
+        super(_TracingInstrument, self).start(name)
+
+    def stop(self, name):
+        super(_TracingInstrument, self).stop(name)
+        peak = tracemalloc.get_traced_memory()[1] / 2.**20
+        tracemalloc.stop()
+        self.peaks[name] = max(self.peaks[name], peak)
+
+
+def write_edgelist(graph, path):
+    """Writes the interactions of a graph as an edge list file"""
+    names = graph.names
+    with open(path, 'w') as fh:
+        for a, b in graph.edges.tolist():
+            fh.write("%s %s\n" % (names[a], names[b]))
+
+
+def _run(alg_cls, filename, params, memory):
+    """Times (and optionally traces the memory of) loading the network from its
+    edge list and every stage the algorithm reports in its metrics. Returns a list
+    of (stage, seconds, peak MB or None)"""
+    instrument = _TracingInstrument() if memory else Instrument()
+    instrument.start("load")
+    graph = Graph.from_edgelist(filename)
+    instrument.stop("load")
+    load = instrument.metrics["timings"]["load"]
+    load_peak = instrument.peaks["load"] if memory else None
+
+    alg = alg_cls(graph, instrument=instrument, **params)
+    sink = io.StringIO()
+    with contextlib.redirect_stdout(sink), contextlib.redirect_stderr(sink):
+        alg.cluster()
+    stages = [("load", load, load_peak)]
+    for name, seconds in alg.metrics["timings"].items():
+        stages.append((name, seconds, instrument.peaks[name] if memory else None))
+    return stages
+
+
+def run_benchmark(sizes=(1000, 10000, 100000), algorithms=("MCODE", "DPCLUS", "IPCA", "COACH"),
+                  params=None, seed=0, repeat=1, memory=True):
+    """Runs every algorithm on synthetic networks of the given sizes (in edges).
+
+    Returns a list of records, one per algorithm, size and stage: reading the
+    network from an edge list file (``"load"``) and the stages of the algorithm's
+    own ``metrics`` timings. Each record has the best wall-clock time of
+    ``repeat`` runs and, with ``memory``, the peak memory traced during the stage
+    in a separate run (tracing slows Python code down, so it is never timed).
+    ``params`` maps algorithm names to keyword arguments.
+
+    """
+    params = params or {}
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n_edges in sizes:
+            graph, _ = synthetic_ppi(n_edges, seed=seed)
+            filename = os.path.join(tmp, "synthetic_%d.txt" % n_edges)
+            write_edgelist(graph, filename)
+            for name in algorithms:
+                alg_cls = ALGORITHMS[name]
+                runs = [_run(alg_cls, filename, params.get(name, {}), False) for _ in range(repeat)]
+                peaks = _run(alg_cls, filename, params.get(name, {}), True) if memory else None
+                for i, (stage, _, _) in enumerate(runs[0]):
+                    records.append({
+                        "algorithm": name,
+                        "n_edges": graph.n_edges,
+                        "n_nodes": graph.n_nodes,
+                        "stage": stage,
+                        "seconds": min(run[i][1] for run in runs),
+                        "peak_mb": peaks[i][2] if peaks else None,
+                    })
+    return records
+
+
+def write_report(records, path):
+    """Writes benchmark records to a JSON or, for a ``.csv`` path, CSV report"""
+    if path.endswith(".csv"):
+        with open(path, 'w', newline='') as fh:
+            writer = csv.DictWriter(fh, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        report = {"python": platform.python_version(), "numpy": np.__version__,
+                  "records": records}
+        with open(path, 'w') as fh:
+            json.dump(report, fh, indent=2)
+
+
+def read_report(path):
+    """Reads the records of a report written by ``write_report``"""
+    if path.endswith(".csv"):
+        with open(path, newline='') as fh:
+            records = list(csv.DictReader(fh))
+        for r in records:
+            r["n_edges"], r["n_nodes"] = int(r["n_edges"]), int(r["n_nodes"])
+            r["seconds"] = float(r["seconds"])
+            r["peak_mb"] = float(r["peak_mb"]) if r["peak_mb"] else None
+        return records
+    with open(path) as fh:
+        return json.load(fh)["records"]
+
+
+def compare_reports(records, baseline, tolerance=0.25, min_seconds=0.05):
+    """Compares records against baseline records of the same algorithm, size and
+    stage. Returns one dict per pair whose time or peak memory grew by more than
+    ``tolerance`` (a fraction); stages faster than ``min_seconds`` are too noisy to
+    compare times on"""
+    key = lambda r: (r["algorithm"], r["n_edges"], r["stage"])
+    base = dict((key(r), r) for r in baseline)
+    regressions = []
+    for r in records:
+        b = base.get(key(r))
+        if b is None:
+            continue
+        for field in ("seconds", "peak_mb"):
+            old, new = b.get(field), r.get(field)
+            if old is None or new is None:
+                continue
+            if field == "seconds" and max(old, new) < min_seconds:
+                continue
+            if new > old * (1 + tolerance):
+                regressions.append({"algorithm": r["algorithm"], "n_edges": r["n_edges"],
+                                    "stage": r["stage"], "field": field,
+                                    "baseline": old, "current": new, "ratio": new / old})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the protclus algorithms on synthetic PPI networks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="network sizes in edges")
+    parser.add_argument("--algorithms", nargs="+", default=list(ALGORITHMS), choices=list(ALGORITHMS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip the memory profiling runs")
+    parser.add_argument("--output", default="benchmark.json", help="JSON or .csv report path")
+    parser.add_argument("--baseline", help="report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    records = run_benchmark(args.sizes, args.algorithms, seed=args.seed,
+                            repeat=args.repeat, memory=args.memory)
+    write_report(records, args.output)
+    for r in records:
+        peak = "" if r["peak_mb"] is None else "%10.1f MB" % r["peak_mb"]
+        print("%-7s %9d edges  %-10s %10.3f s %s" % (r["algorithm"], r["n_edges"], r["stage"], r["seconds"], peak))
+
+    if args.baseline:
+        regressions = compare_reports(records, read_report(args.baseline), args.tolerance)
+        for r in regressions:
+            print("REGRESSION %(algorithm)s %(n_edges)d edges %(stage)s %(field)s: "
+                  "%(baseline).3f -> %(current).3f (x%(ratio).2f)" % r)
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
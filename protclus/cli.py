@@ -0,0 +1,204 @@
+# Command line interface running the clustering algorithms on batches of networks
+# Every network and algorithm pair is a job; jobs run largest network first in a
+# pool of worker processes and write their clusters plus a run summary
+
+# Author: Paul Scherer
+# MIT LICENSE
+
+import argparse
+import ast
+import csv
+import glob
+import json
+import os
+import sys
+import time
+
+from . import ALGORITHMS
+from .graph import Graph
+from .parallel import resolve_jobs, worker_pool
+
+try:
+    import resource
+except ImportError: # not available on Windows
+    resource = None
+
+FIELDS = ["network", "algorithm", "n_nodes", "n_edges", "clusters",
+          "load_seconds", "cluster_seconds", "peak_mb", "output", "error"]
+
+WEIGHTED_ALGORITHMS = ("MCODE", "DPCLUS")
+
+
+def parse_params(specs):
+    """Parses ``ALGORITHM.name=value`` parameter specs into a dict of algorithm
+    name => keyword arguments. Values are Python literals, or strings otherwise"""
+    params = dict((name, {}) for name in ALGORITHMS)
+    for spec in specs:
+        key, sep, value = spec.partition("=")
+        name, dot, arg = key.partition(".")
+        name = name.upper()
+        if not sep or not dot or name not in ALGORITHMS:
+            raise ValueError(f"Parameter {spec!r} is not of the form ALGORITHM.name=value")
+        try:
+            value = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            pass
+        params[name][arg] = value
+    return params
+
+
+def expand_networks(patterns):
+    """Network files matching a list of paths or glob patterns, without repeats"""
+    networks = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if path not in networks:
+                networks.append(path)
+    return networks
+
+
+def _peak_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2.**20 if sys.platform == "darwin" else peak / 2.**10
+
+
+def run_job(job):
+    """Loads a network and runs one algorithm on it, streaming the clusters to the
+    job's output file. Returns the job's summary record"""
+    network, name, params, options, output = job
+    record = dict((field, None) for field in FIELDS)
+    record.update(network=network, algorithm=name, output=output)
+    try:
+        start = time.perf_counter()
+        if options["columns"]:
+            graph = Graph.from_table(network, *options["columns"], min_weight=options["min_weight"],
+                                     delimiter=options["delimiter"], header=options["header"])
+        else:
+            graph = Graph.from_edgelist(network, options["weighted"], options["min_weight"],
+                                        options["cache"])
+        record["load_seconds"] = time.perf_counter() - start
+        record["n_nodes"], record["n_edges"] = graph.n_nodes, graph.n_edges
+
+        if options["weighted"] and name in WEIGHTED_ALGORITHMS:
+            params = dict(params, weighted=True)
+        start = time.perf_counter()
+        record["clusters"] = ALGORITHMS[name](graph, **params).stream_clusters(output)
+        record["cluster_seconds"] = time.perf_counter() - start
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+    record["peak_mb"] = _peak_mb()
+    return record
+
+
+def write_summary(records, path):
+    """Writes job records to a JSON or, for a ``.csv`` path, CSV summary"""
+    if path.endswith(".csv"):
+        with open(path, 'w', newline='') as fh:
+            writer = csv.DictWriter(fh, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, 'w') as fh:
+            json.dump({"records": records}, fh, indent=2)
+
+
+def parse_columns(specs):
+    """Column positions, or names where not integers, of ``--columns``"""
+    return [int(c) if c.isdigit() else c for c in specs] if specs else None
+
+
+def run_batch(networks, algorithms, params=None, output_dir="protclus_output", n_jobs=1,
+              weighted=False, min_weight=None, cache=False, columns=None, delimiter=None,
+              header=None):
+    """Runs every algorithm on every network, each pair as a job of its own in a
+    pool of ``n_jobs`` worker processes (-1 for all cpus). Jobs on the largest
+    network files start first, and every job runs in a fresh process so that its
+    peak memory is its own. Clusters are written to ``output_dir`` as
+    ``<network>.<algorithm>.txt``. With ``columns`` (source, target and optionally
+    weight column, by position or header name) networks are read as tables with
+    ``Graph.from_table`` instead of edge lists, whose first line is a header if
+    ``header`` or, by default, if columns are given by name. Returns the job
+    records in input order"""
+    params = params or {}
+    stems = [os.path.splitext(os.path.basename(n))[0] for n in networks]
+    if len(set(stems)) != len(stems):
+        raise ValueError("Network file names must be unique, their outputs would clash")
+    os.makedirs(output_dir, exist_ok=True)
+
+    if columns is not None and not 2 <= len(columns) <= 3:
+        raise ValueError("Columns are a source, a target and optionally a weight column")
+    if columns is not None and (weighted or min_weight is not None) and len(columns) < 3:
+        raise ValueError("Weights need a weight column")
+    if columns is not None and cache:
+        raise ValueError("Tables are not cached, only edge lists are")
+    if columns is None and header:
+        raise ValueError("Only tables read with columns have a header")
+    options = {"weighted": weighted, "min_weight": min_weight, "cache": cache,
+               "columns": columns, "delimiter": delimiter, "header": header}
+    jobs = [(network, name, params.get(name, {}), options,
+             os.path.join(output_dir, f"{stem}.{name.lower()}.txt"))
+            for network, stem in zip(networks, stems) for name in algorithms]
+    sizes = [os.path.getsize(job[0]) if os.path.exists(job[0]) else 0 for job in jobs]
+    order = sorted(range(len(jobs)), key=lambda i: -sizes[i])
+
+    records = [None] * len(jobs)
+    with worker_pool(max(1, min(resolve_jobs(n_jobs), len(jobs))), maxtasksperchild=1) as pool:
+        for i, record in zip(order, pool.imap(run_job, [jobs[i] for i in order])):
+            records[i] = record
+            status = record["error"] or "%d clusters" % record["clusters"]
+            print("%s %s: %s" % (record["network"], record["algorithm"], status), flush=True)
+    return records
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="protclus",
+                                     description="Run protein complex detection on batches of PPI networks")
+    parser.add_argument("networks", nargs="+", help="edge list files or glob patterns")
+    parser.add_argument("-a", "--algorithms", nargs="+", default=list(ALGORITHMS),
+                        type=str.upper, choices=list(ALGORITHMS))
+    parser.add_argument("-p", "--param", action="append", default=[], metavar="ALGORITHM.NAME=VALUE",
+                        help="algorithm parameter, e.g. MCODE.weight_threshold=0.3 (repeatable)")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="worker processes (-1 for all cpus)")
+    parser.add_argument("-o", "--output-dir", default="protclus_output")
+    parser.add_argument("--summary", help="JSON or .csv summary path (default: summary.csv in the output directory)")
+    parser.add_argument("--weighted", action="store_true",
+                        help="read the third column as interaction weights")
+    parser.add_argument("--min-weight", type=float, help="skip interactions weighing less")
+    parser.add_argument("--cache", action="store_true", help="cache parsed edge lists next to the inputs (not with --columns)")
+    parser.add_argument("--columns", nargs="+", metavar="COLUMN",
+                        help="read networks as (optionally compressed) tables, with the source, target "
+                             "and optional weight columns given by position or header name")
+    parser.add_argument("--delimiter", help="table field delimiter (default: whitespace)")
+    parser.add_argument("--header", action="store_true", default=None,
+                        help="skip the first line of tables as a header (implied by column names)")
+    args = parser.parse_args(argv)
+
+    try:
+        params = parse_params(args.param)
+    except ValueError as e:
+        parser.error(str(e))
+    networks = expand_networks(args.networks)
+    if not networks:
+        parser.error("no network files found")
+
+    try:
+        records = run_batch(networks, args.algorithms, params, args.output_dir, args.jobs,
+                            args.weighted, args.min_weight, args.cache,
+                            parse_columns(args.columns), args.delimiter, args.header)
+    except ValueError as e:
+        parser.error(str(e))
+    summary = args.summary or os.path.join(args.output_dir, "summary.csv")
+    write_summary(records, summary)
+    for r in records:
+        if r["error"] is None:
+            peak = "" if r["peak_mb"] is None else "%10.1f MB" % r["peak_mb"]
+            print("%-30s %-7s %7d clusters %10.3f s %s" % (
+                os.path.basename(r["network"]), r["algorithm"], r["clusters"],
+                r["load_seconds"] + r["cluster_seconds"], peak))
+    return 1 if any(r["error"] for r in records) else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -4,21 +4,151 @@
 # Author: Paul Scherer
 # MIT LICENSE
 
+import copy
+import os
+
+from .graph import Graph
+from .instrument import Instrument
+from .parallel import resolve_jobs, worker_pool
+from .results import ClusterSet
+
+
+def _cluster_batch(algs):
+    clusters = [c for alg in algs for c in alg.iter_clusters()]
+    return clusters, [alg.metrics for alg in algs]
+
 class ClusterAlg(object):
     """General class for clustering algorithms defines some features common to all 
     clustering algorithms in the package
 
+    The input network is either the path of an edge list file, an already
+    loaded ``Graph``, which lets several algorithms share one parsed network, or
+    a network held in memory: a sparse adjacency matrix, a NetworkX graph, an edge
+    table or an edge array (see ``Graph.from_data``). Files, tables and arrays are
+    read with their third column as interaction weights if ``weighted``, skipping
+    interactions weighing less than ``min_weight``.
+
+    Runs are silent. Stage timings and counters are collected by ``instrument``
+    (an ``Instrument``, by default without progress callback) and are available
+    as ``metrics`` once a run is over.
+
     """
 
-    def __init__(self, filename):
-        self.filename = filename
+    def __init__(self, filename, weighted=False, min_weight=None, instrument=None):
+        if isinstance(filename, (str, os.PathLike)):
+            self._graph = None
+            self.filename = filename
+        else:
+            self._graph = Graph.from_data(filename, weighted, min_weight)
+            self.filename = self._graph.filename
+        self.weighted = weighted
+        self.min_weight = min_weight
+        self.instrument = instrument if instrument is not None else Instrument()
         self.clusters = []
 
     def __str__(self):
         return (f"Clustering algorithm on {self.filename}")
 
+    @property
+    def graph(self):
+        """The input network, loaded once on first use"""
+        if self._graph is None:
+            self._graph = Graph.from_edgelist(self.filename, self.weighted, self.min_weight)
+        if self.weighted and not self._graph.weighted:
+            raise ValueError("weighted clustering needs a graph loaded with weights")
+        return self._graph
+
+    @property
+    def metrics(self):
+        """Stage timings and counters of the last run"""
+        return self.instrument.metrics
+
+    def iter_clusters(self, *args, **kwargs):
+        """Yields clusters one at a time as they are found. The consumer can stop
+        early, and the clusters are not kept on the object"""
+        raise NotImplementedError
+
+    def _component_alg(self, graph):
+        """Copy of the algorithm with the same parameters, to run on one component"""
+        alg = copy.copy(self)
+        alg._graph = graph
+        alg.instrument = Instrument()
+        alg.clusters = []
+        return alg
+
+    def iter_component_clusters(self, n_jobs=1, batch_edges=10000):
+        """Yields the clusters found by running the algorithm on every connected
+        component of the network on its own. These are the clusters of a run on
+        the whole network, only ordered component by component, in order of the
+        first node read of every component.
+
+        Components are run in a pool of ``n_jobs`` worker processes (-1 for all
+        cpus). Those with more than ``batch_edges`` interactions are jobs of their
+        own, smaller ones are batched together, and the largest jobs start first.
+
+        """
+        instrument = self.instrument
+        instrument.reset()
+        with instrument.stage("components"):
+            graphs = self.graph.split_components()
+        instrument.count("components", len(graphs))
+        n_jobs = resolve_jobs(n_jobs)
+        if n_jobs <= 1:
+            for i, graph in enumerate(graphs):
+                alg = self._component_alg(graph)
+                yield from alg.iter_clusters()
+                instrument.merge(alg.metrics)
+                instrument.report("components", i + 1, len(graphs))
+            return
+
+        jobs, sizes = [[]], [0]
+        for graph in graphs:
+            if jobs[-1] and sizes[-1] + graph.n_edges > batch_edges:
+                jobs.append([])
+                sizes.append(0)
+            jobs[-1].append(self._component_alg(graph))
+            sizes[-1] += graph.n_edges
+        with worker_pool(min(n_jobs, len(jobs))) as pool:
+            results = [None] * len(jobs)
+            for i in sorted(range(len(jobs)), key=sizes.__getitem__, reverse=True):
+                results[i] = pool.apply_async(_cluster_batch, (jobs[i],))
+            done = 0
+            for i, result in enumerate(results):
+                clusters, metrics = result.get()
+                for m in metrics:
+                    instrument.merge(m)
+                done += len(jobs[i])
+                instrument.report("components", done, len(graphs))
+                yield from clusters
+
+    def cluster_components(self, n_jobs=1, batch_edges=10000):
+        """Clusters the network component by component, see ``iter_component_clusters``"""
+        self.clusters = list(self.iter_component_clusters(n_jobs, batch_edges))
+
+    def cluster_set(self, *args, **kwargs):
+        """Runs the algorithm collecting the clusters into a compact ``ClusterSet``
+        over the node table of the graph, one cluster at a time, so that they are
+        never all held as Python sets. Arguments are passed on to
+        ``iter_clusters``"""
+        graph = self.graph
+        return ClusterSet.from_clusters(self.iter_clusters(*args, **kwargs), graph.names, graph.index)
+
     def save_clusters(self, filehandle):
         """Saves clusters, one cluster per line into the input filehandle"""
         with open(filehandle, 'w') as fh:
             for c in self.clusters:
                 fh.write(' '.join(c) + "\n")
+
+    def stream_clusters(self, filehandle, *args, **kwargs):
+        """Runs the algorithm writing every cluster to the input filehandle (a path
+        or an open file), one cluster per line, as soon as it is found. Arguments
+        are passed on to ``iter_clusters``. Returns the number of clusters"""
+        if isinstance(filehandle, (str, os.PathLike)):
+            with open(filehandle, 'w') as fh:
+                return self.stream_clusters(fh, *args, **kwargs)
+        count = 0
+        for c in self.iter_clusters(*args, **kwargs):
+            filehandle.write(' '.join(c) + "\n")
+            filehandle.flush()
+            count += 1
+        return count
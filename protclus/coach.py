@@ -4,14 +4,20 @@
 # Python 2 Author: True Price <jtprice@cs.unc.edu>
 # Python 3 protclus version: Paul Scherer
 
+import copyreg
+import io
+import pickle
 from collections import defaultdict
-from itertools import combinations
+from itertools import combinations, compress, count
 from functools import reduce
+
+import numpy as np
 from py27hash.dict import Dict
+from py27hash.key import Keys
 from py27hash.set import Set
-from tqdm import tqdm
 
 from .cluster_alg import ClusterAlg
+from .parallel import chunk_size, resolve_jobs, worker_pool, worker_state
 
 # return average degree and density for a graph
 def graph_stats(graph):
@@ -20,13 +26,52 @@ def graph_stats(graph):
     return avg_deg, density
 
 # return core nodes, given a graph and its average degree
-get_core_nodes = lambda g,avg: Set(v for v,n in g.items() if len(n) >= avg)
+get_core_nodes = lambda g,avg,Set=Set: Set(v for v,n in g.items() if len(n) >= avg)
 
 # return NA score
 NA_score = lambda a,b: float(len(a & b)**2) / (len(a) * len(b))
 
 
-def core_removal(threshold, graph):
+class ReadOrder(object):
+    """Native containers keyed by node id. Wherever the result depends on iteration
+    order, sets are iterated in node read order and dicts are filled in that order"""
+    Set, Dict = set, dict
+    ordered = staticmethod(sorted)
+
+class Py27Order(object):
+    """py27hash containers keyed by protein name, iterated as in the original
+    Python 2.7 script"""
+    Set, Dict = Set, Dict
+    ordered = staticmethod(lambda nodes: nodes)
+
+ORDERS = {"read": ReadOrder, "py27": Py27Order}
+
+CORES_VERSION = 2
+
+
+# py27hash containers and their key order trackers pickle by re-inserting their
+# keys, which does not keep the Python 2.7 iteration order of containers that had
+# keys removed. They are saved with the tracker's state as is instead
+def _restore_py27(cls, items, keys):
+    container = cls()
+    (dict if cls is Dict else set).update(container, items)
+    container.keylist = Keys.__new__(Keys)
+    container.keylist.__dict__.update(keys)
+    return container
+
+def _reduce_py27_dict(obj):
+    return _restore_py27, (Dict, dict(obj.items()), vars(obj.keylist))
+
+def _reduce_py27_set(obj):
+    return _restore_py27, (Set, set(obj), vars(obj.keylist))
+
+class _CorePickler(pickle.Pickler):
+    dispatch_table = copyreg.dispatch_table.copy()
+    dispatch_table[Dict] = _reduce_py27_dict
+    dispatch_table[Set] = _reduce_py27_set
+
+
+def core_removal(threshold, graph, order=ReadOrder):
     if len(graph) == 1: # need at least two nodes in the graph...
         return [graph]
 
@@ -35,7 +80,7 @@ def core_removal(threshold, graph):
         return [graph]
     else:
         # find and remove core nodes; create connected subcomponents
-        core_nodes = get_core_nodes(graph, avg_deg)
+        core_nodes = get_core_nodes(graph, avg_deg, order.Set)
         result = []
         subgraphs = []
         for v,n in graph.items():
@@ -46,7 +91,7 @@ def core_removal(threshold, graph):
                     s |= n
                     break
             else:
-                subgraphs.append(n | Set([v]))
+                subgraphs.append(n | order.Set([v]))
         # connected subcomponent joining
         i = 0
         while i < len(subgraphs) - 1:
@@ -60,127 +105,496 @@ def core_removal(threshold, graph):
             i += 1
         # recursive core removal
         for s in subgraphs:
-            tresults = core_removal(threshold, Dict((v,graph[v] & s) for v in s))
+            tresults = core_removal(threshold,
+                order.Dict((v,graph[v] & s) for v in order.ordered(s)), order)
             for tc in tresults:
-                nodes = Set()
+                nodes = order.Set()
                 for v,n in tc.items():
                     nodes.add(v)
                     n |= graph[v] & core_nodes
-                for c in core_nodes:
+                for c in order.ordered(core_nodes):
                     tc[c] = graph[c] & (nodes | core_nodes)
             result += tresults
         return result
 
+def vertex_cores(data, vertex, threshold, order=ReadOrder):
+    """Candidate cores found in the neighborhood graph of a vertex, as a list of
+    (core graph, core nodes, density) tuples. In read order they are found on
+    bitsets by ``dense_vertex_cores``, with the same result"""
+    if order is ReadOrder:
+        return dense_vertex_cores(data, vertex, threshold)
+    return set_vertex_cores(data, vertex, threshold, order)
+
+def set_vertex_cores(data, vertex, threshold, order=ReadOrder):
+    """``vertex_cores`` on sets, in the containers of ``order``"""
+    Set = order.Set
+
+    # build neighborhood graph
+    vertices = Set([vertex]) | data[vertex]
+    size1_neighbors = Set()
+    graph = { }
+    for v in order.ordered(vertices):
+        n = data[v] & vertices
+        if len(n) > 1: # ignore size-1 vertices
+            graph[v] = n
+        else:
+            size1_neighbors.add(v)
+    if len(graph) < 2: # not enough connections in this graph
+        return []
+    graph[vertex] -= size1_neighbors
+
+    # get core graph
+    avg_deg,density = graph_stats(graph)
+    core_nodes = get_core_nodes(graph, avg_deg, Set)
+    vertices = Set(graph.keys())
+    for v in vertices - core_nodes:
+        del graph[v]
+    for n in graph.values():
+        n &= core_nodes
+    if len(graph) < 2: # not enough connections in this graph
+        return []
+    graph_nodes = Set(graph)
+
+    # inner loop
+    cores = []
+    for sg in core_removal(threshold, graph, order):
+        while True:
+            _,density = graph_stats(sg)
+            # if density threshold met, stop; else, remove min degree node
+            if density >= threshold: break
+            w = min(sg.items(), key=lambda k: len(k[1]))[0]
+            del sg[w]
+            for n in sg.values():
+                n.discard(w)
+
+        sg_nodes = Set(sg)
+        while graph_nodes - sg_nodes:
+            w = max(order.ordered(graph_nodes - sg_nodes),
+                    key=lambda v: len(graph[v] & sg_nodes))
+            new_sg = sg.copy()
+            for v,n in new_sg.items():
+                if w in graph[v]:
+                    n.add(w)
+            new_sg[w] = graph[w] & sg_nodes
+            _,density = graph_stats(new_sg)
+            if density < threshold: break
+            sg = new_sg
+            sg_nodes.add(w)
+        cores.append((sg, sg_nodes, density))
+    return cores
+
+# Dense neighborhood graphs: the neighbors of a vertex (and the vertex itself) are
+# numbered 0..k-1 in read order, and every set of local nodes, such as an
+# adjacency row, is a bitset held in a Python int. Intersections are then single
+# word operations and degrees popcounts. The functions below mirror the set based
+# ones step by step, ties included, on dicts of local node => neighbor bitset
+
+_popcount = getattr(int, 'bit_count', None) or (lambda mask: bin(mask).count('1'))
+
+_BINARY_DIGITS = bytes.maketrans(b'01', b'\0\1')
+
+def _bits(mask):
+    """Local nodes of a bitset, ascending"""
+    return compress(count(), bin(mask)[:1:-1].encode().translate(_BINARY_DIGITS))
+
+def dense_graph_stats(graph):
+    """``graph_stats`` of a dense graph"""
+    avg_deg = sum(_popcount(n) for n in graph.values()) / float(len(graph))
+    density = avg_deg / (len(graph)-1)
+    return avg_deg, density
+
+def dense_core_removal(threshold, graph):
+    """``core_removal`` of a dense graph, in read order"""
+    if len(graph) == 1:
+        return [graph]
+
+    avg_deg, density = dense_graph_stats(graph)
+    if density >= threshold:
+        return [graph]
+    core_nodes = 0
+    for v, n in graph.items():
+        if _popcount(n) >= avg_deg:
+            core_nodes |= 1 << v
+    subgraphs = []
+    for v, n in graph.items():
+        if core_nodes >> v & 1: continue
+        n &= ~core_nodes
+        for i, s in enumerate(subgraphs):
+            if n & s:
+                subgraphs[i] = s | n
+                break
+        else:
+            subgraphs.append(n | 1 << v)
+    # connected subcomponent joining
+    i = 0
+    while i < len(subgraphs) - 1:
+        j = i + 1
+        while j < len(subgraphs):
+            if subgraphs[i] & subgraphs[j]:
+                subgraphs[i] |= subgraphs.pop(j)
+            else:
+                j += 1
+        i += 1
+    # recursive core removal
+    result = []
+    for s in subgraphs:
+        tresults = dense_core_removal(threshold, dict((v, graph[v] & s) for v in _bits(s)))
+        for tc in tresults:
+            nodes = 0
+            for v in tc:
+                nodes |= 1 << v
+                tc[v] |= graph[v] & core_nodes
+            for c in _bits(core_nodes):
+                tc[c] = graph[c] & (nodes | core_nodes)
+        result += tresults
+    return result
+
+class DenseCore(frozenset):
+    """Nodes of a candidate core found on bitsets, with the density that
+    ``graph_stats`` gives for its core graph, all that is needed of the graph"""
+
+    def __new__(cls, nodes, density):
+        core = super(DenseCore, cls).__new__(cls, nodes)
+        core.density = density
+        return core
+
+    def __reduce__(self):
+        return DenseCore, (list(self), self.density)
+
+def core_density(core):
+    """Density of a candidate core graph, a dict of node => neighbors or a
+    ``DenseCore``"""
+    if isinstance(core, DenseCore):
+        return core.density
+    return graph_stats(core)[1]
+
+def dense_vertex_cores(data, vertex, threshold):
+    """``vertex_cores`` in read order, on the dense neighborhood graph of the
+    vertex. Cores are returned as (``DenseCore``, ``DenseCore``, density) tuples,
+    the core standing in for both the core graph and its nodes"""
+    vertices = set(data[vertex])
+    vertices.add(vertex)
+    nodes = sorted(vertices) # local node => node id
+    bit_of = dict((v, 1 << i) for i, v in enumerate(nodes))
+
+    # build neighborhood graph
+    size1_neighbors = 0
+    graph = {}
+    for i, v in enumerate(nodes):
+        n = data[v] & vertices
+        if len(n) > 1: # ignore size-1 vertices
+            graph[i] = sum(map(bit_of.__getitem__, n))
+        else:
+            size1_neighbors |= 1 << i
+    if len(graph) < 2: # not enough connections in this graph
+        return []
+    graph[nodes.index(vertex)] &= ~size1_neighbors
+
+    # get core graph
+    avg_deg, density = dense_graph_stats(graph)
+    core_nodes = 0
+    for v, n in graph.items():
+        if _popcount(n) >= avg_deg:
+            core_nodes |= 1 << v
+    graph = dict((v, n & core_nodes) for v, n in graph.items() if core_nodes >> v & 1)
+    if len(graph) < 2: # not enough connections in this graph
+        return []
+    graph_nodes = core_nodes
+
+    # inner loop. Degrees, link counts and the edge total are kept up to date as
+    # nodes leave or join instead of being recounted, rows are not updated
+    cores = []
+    for sg in dense_core_removal(threshold, graph):
+        degree = dict((v, _popcount(n)) for v, n in sg.items())
+        total = sum(degree.values())
+        sg_nodes = 0
+        for v in sg:
+            sg_nodes |= 1 << v
+        while True:
+            density = total / float(len(degree)) / (len(degree)-1)
+            # if density threshold met, stop; else, remove min degree node
+            if density >= threshold: break
+            w = min(degree, key=degree.__getitem__)
+            total -= degree.pop(w)
+            sg_nodes &= ~(1 << w)
+            for u in _bits(sg[w] & sg_nodes):
+                degree[u] -= 1
+                total -= 1
+
+        links = dict((v, _popcount(graph[v] & sg_nodes)) for v in _bits(graph_nodes & ~sg_nodes))
+        size = len(degree)
+        own_total = total
+        while graph_nodes & ~sg_nodes:
+            w = max(_bits(graph_nodes & ~sg_nodes), key=links.__getitem__)
+            # the set based version extends a shallow copy of sg, whose rows it
+            # shares, so sg gains the links to w even if w is then rejected
+            own_total = total + links[w]
+            density = (total + 2 * links[w]) / float(size + 1) / size
+            if density < threshold: break
+            total = own_total = total + 2 * links[w]
+            size += 1
+            sg_nodes |= 1 << w
+            for u in _bits(graph[w]):
+                if u in links:
+                    links[u] += 1
+        core = DenseCore((nodes[v] for v in _bits(sg_nodes)), own_total / float(size) / (size-1))
+        cores.append((core, core, density))
+    return cores
+
+def adjacency(graph, order):
+    """Adjacency of a graph in the containers of an order name: protein name =>
+    neighboring proteins for ``"py27"``, node id => neighboring node ids otherwise"""
+    if order == "py27":
+        return graph.py27_adjacency()
+    return dict(enumerate(graph.neighbor_sets()))
+
+
+# adjacency, order and density threshold, in every worker process
+def _cores_state(graph, order, threshold):
+    return {"data": adjacency(graph, order), "order": ORDERS[order], "threshold": threshold}
+
+def _vertices_cores(vertices):
+    data, order, threshold = worker_state["data"], worker_state["order"], worker_state["threshold"]
+    cores = [core for vertex in vertices for core in vertex_cores(data, vertex, threshold, order)]
+    fh = io.BytesIO()
+    _CorePickler(fh, protocol=pickle.HIGHEST_PROTOCOL).dump(cores)
+    return fh.getvalue()
+
+def parallel_vertex_cores(graph, order, threshold, n_jobs, vertices=None, instrument=None):
+    """Candidate cores of every vertex, as ``vertex_cores`` finds them, computed in
+    a pool of ``n_jobs`` worker processes (-1 for all cpus) that each build the
+    adjacency of ``graph`` for ``order``. Cores are yielded in the order of
+    ``vertices`` (by default the adjacency's), so the result equals the serial
+    one. Under ``"py27"`` order the workers must share the hash seed of the parent,
+    as forked workers do, or PYTHONHASHSEED must be set. Progress over the
+    vertices is reported to ``instrument`` if given"""
+    n_jobs = resolve_jobs(n_jobs)
+    vertices = list(adjacency(graph, order) if vertices is None else vertices)
+    step = chunk_size(len(vertices), n_jobs)
+    chunks = [vertices[i:i + step] for i in range(0, len(vertices), step)]
+    with worker_pool(n_jobs, _cores_state, (graph, order, threshold)) as pool:
+        for i, part in enumerate(pool.imap(_vertices_cores, chunks)):
+            cores = pickle.loads(part)
+            if instrument is not None:
+                instrument.count("candidate_cores", len(cores))
+                instrument.report("cores", min((i + 1) * step, len(vertices)), len(vertices))
+            yield from cores
+
+def filter_cores(candidates, threshold):
+    """Redundancy filtering of candidate cores, given as (core graph, core nodes,
+    density) tuples in vertex order. A candidate is added to the preliminary cores
+    unless its NA score with one of them reaches ``threshold``, in which case it
+    replaces the most similar core if it is larger and denser. Returns the list of
+    preliminary core graphs"""
+    SC = [] # currently-detected preliminary cores
+    core_index = defaultdict(set) # protein => indices of the cores in SC containing it
+    for sg, sg_nodes, density in candidates:
+        # cores sharing no node with sg score 0, so only those found
+        # through the node => cores index need scoring
+        max_sim, index = (0, 0) if SC else (-1, None)
+        overlaps = defaultdict(int) # core index => nodes shared with sg
+        for v in sg_nodes:
+            for i in core_index[v]:
+                overlaps[i] += 1
+        for i in sorted(overlaps):
+            sim = float(overlaps[i]**2) / (len(SC[i]) * len(sg_nodes))
+            if sim > max_sim:
+                max_sim = sim
+                index = i
+        if max_sim < threshold:
+            index = len(SC)
+            SC.append(sg)
+        else:
+            density_i = core_density(SC[index])
+            if not density * len(sg) > density_i * len(SC[index]):
+                continue
+            for v in SC[index]:
+                core_index[v].discard(index)
+            SC[index] = sg
+        for v in sg_nodes:
+            core_index[v].add(index)
+    return SC
+
+def attach_peripherals(data, cores, threshold, order=ReadOrder):
+    """Extends every preliminary core with the neighbors that interact with more
+    than ``threshold`` of its nodes. Yields the nodes of every complex"""
+    for core in cores:
+        nodes = frozenset(core)
+        neighbors = reduce(lambda x,y: x|y, (data[v] for v in nodes)) - nodes
+        neighbors -= order.Set(v for v in neighbors
+          if float(len(data[v] & nodes)) / len(nodes) <= threshold)
+        yield nodes | neighbors
+
 class COACH(ClusterAlg):
-    """Class for running and administrating the COACH algorithm"""
-    def __init__(self, filename, density_threshold=0.7, affinity_threshold=0.225, closeness_threshold=0.5):
-        super(COACH, self).__init__(filename)
+    """Class for running and administrating the COACH algorithm
+
+    ``order`` decides the iteration order wherever the result depends on it. The
+    default ``"read"`` visits vertices and breaks ties in node read order, so results
+    are the same across runs and interpreters, and clusters are returned as a list
+    of protein name tuples in read order. ``"py27"`` keeps the py27hash containers
+    of the original script for exact reproduction of its output, a ``Set`` of tuples.
+
+    Only step 1 depends on ``density_threshold`` and ``affinity_threshold``. Its
+    candidate cores can be computed once with ``candidate_cores``, saved and loaded
+    with ``save_cores`` and ``load_cores``, and reused by ``sweep`` over the other
+    thresholds. ``n_jobs`` sets the number of worker processes finding candidate
+    cores (-1 for all cpus).
+
+    """
+    def __init__(self, filename, density_threshold=0.7, affinity_threshold=0.225, closeness_threshold=0.5,
+                 order="read", min_weight=None, n_jobs=1, instrument=None):
+        super(COACH, self).__init__(filename, min_weight=min_weight, instrument=instrument)
+        if order not in ORDERS:
+            raise ValueError(f"Unknown node order {order!r}, expected 'read' or 'py27'")
         self.density_threshold = density_threshold
         self.affinity_threshold = affinity_threshold
         self.closeness_threshold = closeness_threshold
+        self.order = order
+        self.n_jobs = n_jobs
+        self.candidates = None # candidate cores, see candidate_cores()
+
+    def _component_alg(self, graph):
+        if self.order == "py27":
+            raise ValueError("py27 order depends on the whole network, components are clustered in read order only")
+        alg = super(COACH, self)._component_alg(graph)
+        alg.candidates = None
+        alg.n_jobs = 1
+        return alg
 
     def cluster(self, verbose=False):
-        
-        data = Dict()
+        if self.order == "py27":
+            clusters = ORDERS[self.order].Set(self.iter_clusters(verbose))
+        else:
+            clusters = list(self.iter_clusters(verbose))
 
-        with open(self.filename, 'r') as f:
-            for line in f:
-                a,b = line.split()[:2]
+        self.clusters = clusters
 
-                if a in data:
-                    data[a].add(b)
-                else:
-                    data[a] = Set()
-                    data[a].add(b)
-                if b in data:
-                    data[b].add(a)
-                else:
-                    data[b] = Set()
-                    data[b].add(a)
+        if verbose:
+            print ("Found %d clusters/protein complexes" % (len(clusters)))
+        return clusters
 
-        # step 1: find preliminary cores
-        SC = [] # currently-detected preliminary cores
-        count = 0
-        for vertex,neighbors in tqdm(data.items()):
-            # build neighborhood graph
-            vertices = Set([vertex]) | neighbors
-            size1_neighbors = Set()
-            graph = { }
-            for v in vertices:
-                n = data[v] & vertices
-                if len(n) > 1: # ignore size-1 vertices
-                    graph[v] = n
-                else:
-                    size1_neighbors.add(v)
-            if len(graph) < 2: # not enough connections in this graph
-                continue
-            graph[vertex] -= size1_neighbors
-
-            # get core graph
-            avg_deg,density = graph_stats(graph)
-            core_nodes = get_core_nodes(graph, avg_deg)
-            vertices = Set(graph.keys())
-            for v in vertices - core_nodes:
-                del graph[v]
-            for n in graph.values():
-                n &= core_nodes
-            if len(graph) < 2: # not enough connections in this graph
-                continue
-            graph_nodes = Set(graph)
-
-            # inner loop
-            for sg in core_removal(self.density_threshold, graph):
-                while True:
-                    _,density = graph_stats(sg)
-                    # if density threshold met, stop; else, remove min degree node
-                    if density >= self.density_threshold: break
-                    w = min(sg.items(), key=lambda k: len(k[1]))[0]
-                    del sg[w]
-                    for n in sg.values():
-                        n.discard(w)
-
-                sg_nodes = Set(sg)
-                while graph_nodes - sg_nodes:
-                    w = max(graph_nodes - sg_nodes,
-                            key=lambda v: len(graph[v] & sg_nodes))
-                    new_sg = sg.copy()
-                    for v,n in new_sg.items():
-                        if w in graph[v]:
-                            n.add(w)
-                    new_sg[w] = graph[w] & sg_nodes
-                    _,density = graph_stats(new_sg)
-                    if density < self.density_threshold: break
-                    sg = new_sg
-                    sg_nodes.add(w)
-
-                # redundancy filtering
-                max_sim = -1
-                for i in range(len(SC)):
-                    sim = NA_score(Set(SC[i]), sg_nodes)
-                    if sim > max_sim:
-                        max_sim = sim
-                        index = i
-                if max_sim < self.affinity_threshold:
-                    SC.append(sg)
-                else:
-                    _,density_i = graph_stats(SC[index])
-                    if density * len(sg) > density_i * len(SC[index]):
-                        SC[index] = sg
+    def _adjacency(self):
+        return adjacency(self.graph, self.order)
 
-        # step 2: adding peripheral proteins
-        clusters = Set()
-        for core in SC:
-            nodes = frozenset(core)
-            neighbors = reduce(lambda x,y: x|y, (data[v] for v in nodes)) - nodes
-            neighbors -= Set(v for v in neighbors
-              if float(len(data[v] & nodes)) / len(nodes) <= self.closeness_threshold)
-            clusters.add(tuple(nodes | neighbors))
+    def _candidates(self, data):
+        if self.candidates is not None:
+            return self.candidates
+        if resolve_jobs(self.n_jobs) > 1:
+            return parallel_vertex_cores(self.graph, self.order, self.density_threshold,
+                                         self.n_jobs, data, self.instrument)
+        return self._serial_candidates(data)
 
+    def _serial_candidates(self, data):
+        order = ORDERS[self.order]
+        instrument = self.instrument
+        for i, vertex in enumerate(data):
+            cores = vertex_cores(data, vertex, self.density_threshold, order)
+            instrument.count("candidate_cores", len(cores))
+            instrument.report("cores", i + 1, len(data))
+            yield from cores
 
-        self.clusters = clusters
+    def candidate_cores(self):
+        """Candidate cores of every vertex neighborhood, in vertex order. They only
+        depend on the density threshold, so they are kept on the object, where
+        ``preliminary_cores``, ``sweep`` and later runs reuse them"""
+        if self.candidates is None:
+            self.candidates = list(self._candidates(self._adjacency()))
+        return self.candidates
 
-        print ("Found %d clusters/protein complexes" % (len(clusters)))
-        return clusters
+    def preliminary_cores(self, affinity_threshold=None):
+        """Preliminary cores (step 1) left by redundancy filtering of the candidate
+        cores with ``affinity_threshold``, by default the object's"""
+        if affinity_threshold is None:
+            affinity_threshold = self.affinity_threshold
+        return filter_cores(self.candidate_cores(), affinity_threshold)
+
+    def save_cores(self, path):
+        """Saves the candidate cores (computing them if need be) to a file, so that
+        step 1 can be skipped by ``load_cores`` in another session"""
+        state = {"version": CORES_VERSION, "order": self.order,
+                 "density_threshold": self.density_threshold,
+                 "graph": (self.graph.n_nodes, self.graph.n_edges),
+                 "candidates": self.candidate_cores()}
+        with open(path, 'wb') as fh:
+            _CorePickler(fh, protocol=pickle.HIGHEST_PROTOCOL).dump(state)
+
+    def load_cores(self, path):
+        """Loads candidate cores saved by ``save_cores``. They must have been found
+        on the same network with the same order and density threshold. Only load
+        files you trust, they are pickles"""
+        with open(path, 'rb') as fh:
+            state = pickle.load(fh)
+        if state.get("version") != CORES_VERSION:
+            raise ValueError(f"Unsupported cores file version {state.get('version')!r}")
+        expected = {"order": self.order, "density_threshold": self.density_threshold,
+                    "graph": (self.graph.n_nodes, self.graph.n_edges)}
+        for key, value in expected.items():
+            if state[key] != value:
+                raise ValueError(f"Cores were found with {key} {state[key]!r}, not {value!r}")
+        self.candidates = state["candidates"]
+        return self.candidates
+
+    def _complexes(self, data, cores, closeness_threshold):
+        order = ORDERS[self.order]
+        names, index = self.graph.names, self.graph.index
+        # clusters already yielded, kept as the bytes of their node id arrays
+        # rather than as tuples of names
+        seen = set()
+        for nodes in attach_peripherals(data, cores, closeness_threshold, order):
+            if self.order == "py27":
+                cluster = tuple(nodes)
+                ids = [index[p] for p in cluster]
+            else:
+                ids = sorted(nodes)
+                cluster = tuple(names[v] for v in ids)
+            key = np.array(ids, dtype=np.int32).tobytes()
+            if key not in seen:
+                seen.add(key)
+                yield cluster
+
+    def iter_clusters(self, verbose=False):
+        """Yields the clusters as tuples of proteins. The preliminary cores all have
+        to be found first, after which every core is extended and yielded in turn"""
+        instrument = self.instrument
+        instrument.reset()
+        data = self._adjacency()
+
+        # step 1: find preliminary cores
+        with instrument.stage("cores"):
+            SC = filter_cores(self._candidates(data), self.affinity_threshold)
+        instrument.count("preliminary_cores", len(SC))
+
+        # step 2: adding peripheral proteins
+        complexes = self._complexes(data, SC, self.closeness_threshold)
+        while True:
+            with instrument.stage("attachment"):
+                cluster = next(complexes, None)
+            if cluster is None:
+                break
+            instrument.count("clusters")
+            yield cluster
+
+    def sweep(self, closeness_thresholds=None, affinity_thresholds=None):
+        """Clusters for every combination of the given closeness and affinity
+        thresholds (by default the object's own), finding the candidate cores only
+        once. Returns a dict of (affinity, closeness) threshold pairs => clusters,
+        the clusters being those ``cluster()`` returns with these thresholds"""
+        if closeness_thresholds is None:
+            closeness_thresholds = [self.closeness_threshold]
+        if affinity_thresholds is None:
+            affinity_thresholds = [self.affinity_threshold]
+        closeness_thresholds = list(closeness_thresholds)
+        data = self._adjacency()
+        results = {}
+        for affinity in affinity_thresholds:
+            SC = self.preliminary_cores(affinity)
+            for closeness in closeness_thresholds:
+                clusters = self._complexes(data, SC, closeness)
+                if self.order == "py27":
+                    results[affinity, closeness] = ORDERS[self.order].Set(clusters)
+                else:
+                    results[affinity, closeness] = list(clusters)
+        return results
 
 # if __name__ == '__main__':
 #     filename = "../data/unweighted_example_network.txt"
@@ -6,8 +6,10 @@
 # Python 3 protclus version: Paul Scherer
 
 import sys
-from itertools import combinations
 from collections import defaultdict
+from heapq import heappush, heappop
+
+import numpy as np
 
 from .cluster_alg import ClusterAlg
 
@@ -17,56 +19,120 @@ class zerodict(dict):
     def __missing__(self, k):
         return 0
 
+def read_order(graph):
+    """Tie-breaking priority of every node id (values are decreasing, i.e. negative)
+
+    To match the original DPClus output, ties are broken by the order in which nodes
+    were read from the file. The original algorithm indexes column b after column a,
+    so nodes first seen in column a come before those only ever seen in column b.
+    Nodes without interactions, which graphs built in memory may have, come last
+    in id order.
+
+    """
+    node_index = [None] * len(graph)
+    rank = 0
+    for column in (graph.edges[:, 0], graph.edges[:, 1], np.arange(len(graph))):
+        _, first = np.unique(column, return_index=True)
+        for n in column[np.sort(first)].tolist():
+            if node_index[n] is None:
+                node_index[n] = -rank
+                rank += 1
+    return node_index
+
+class EdgeSupport(object):
+    """Shared neighbor counts of every edge within the unvisited part of the graph
+
+    ``edges[a][b]`` is the number of unvisited common neighbors of the unvisited
+    nodes a and b, ``weights[a]`` the sum of these counts over the edges of a and
+    ``degrees[a]`` the number of unvisited neighbors of a. The counts start from the
+    edge support index of the graph and are then only decremented for the edges
+    around nodes as they are removed.
+
+    """
+
+    def __init__(self, graph):
+        self.data = data = graph.neighbor_sets()
+        self.unvisited = set(range(len(data)))
+        self.edges, self.weights = defaultdict(zerodict), defaultdict(int)
+        self.degrees = [len(n) for n in data]
+        rows = np.repeat(np.arange(len(data)), graph.degree()).tolist()
+        for a, b, shared in zip(rows, graph.indices.tolist(), graph.edge_support().tolist()):
+            if a != b:
+                self.edges[a][b] = shared
+        self.weights.update(enumerate(graph.node_support().tolist()))
+
+    def remove(self, nodes):
+        """Marks nodes as visited, updating the counts of the remaining edges"""
+        data, unvisited = self.data, self.unvisited
+        edges, weights, degrees = self.edges, self.weights, self.degrees
+        for x in nodes:
+            if x not in unvisited: continue # overlapping node from an earlier cluster
+            unvisited.remove(x)
+            for a, shared in edges.pop(x, {}).items():
+                del edges[a][x]
+                weights[a] -= shared
+            weights.pop(x, None)
+
+            # x is no longer a common neighbor of any pair of its neighbors
+            neighbors = data[x] & unvisited
+            for a in neighbors:
+                degrees[a] -= 1
+                for b in data[a] & neighbors:
+                    if b <= a: continue
+                    edges[a][b] -= 1
+                    edges[b][a] -= 1
+                    weights[a] -= 1
+                    weights[b] -= 1
+
 class DPCLUS(ClusterAlg):
     """
     Class for running and administrating Altaf-Ul-Amin's DPClus algorithm
 
+    With ``weighted`` the cluster density and cluster property use the total
+    interaction weight of the edges instead of their number; nodes are still
+    prioritised by edge counts and shared neighbors
+
     """
 
-    def __init__(self, filename, d_threshold=0.9, cp_threshold=0.5):
-        super(DPCLUS, self).__init__(filename)
+    def __init__(self, filename, d_threshold=0.9, cp_threshold=0.5, weighted=False, min_weight=None,
+                 instrument=None):
+        super(DPCLUS, self).__init__(filename, weighted, min_weight, instrument)
         self.d_threshold = d_threshold
         self.cp_threshold = cp_threshold
 
 
     def cluster(self, verbose=False):
-        data = defaultdict(set) # node id => neighboring node ids
-
-        # to match the original DPClus output, we need to keep track of the order in
-        # which nodes were read from the file, in order to maintain cluster order when
-        # breaking ties in our priority ranking (values are decreasing, i.e. negative)
-        node_index = dict()
-        b_list = [] # the original algorithm indexes column b after column a... >:-(
-
-        # read in graph
-        with open(self.filename, 'r') as f:
-            for line in f:
-                a,b = line.split()[:2]
-                data[a].add(b)
-                data[b].add(a)
-                node_index.setdefault(a, -len(node_index))
-                #node_index.setdefault(b, -len(node_index))
-                b_list.append(b)
-        for b in b_list:
-            node_index.setdefault(b, -len(node_index))
-
-        unvisited = set(data)
+        self.clusters = list(self.iter_clusters(verbose))
+
+    def iter_clusters(self, verbose=False):
+        graph = self.graph
+        instrument = self.instrument
+        instrument.reset()
+        data = graph.neighbor_sets() # node id => neighboring node ids
+        node_index = read_order(graph)
+
+        with instrument.stage("support"):
+            support = EdgeSupport(graph)
+        unvisited, edges, weights = support.unvisited, support.edges, support.weights
+        degrees = support.degrees
         num_clusters = 0
 
-        clusters = []
+        # weight of the edges between a node and the cluster, read off the CSR
+        # arrays through a cluster membership mask
+        in_cluster = np.zeros(len(data), dtype=bool)
+        indptr, indices = graph.indptr, graph.indices
+        def cluster_weight(p):
+            links = slice(indptr[p], indptr[p + 1])
+            return float(graph.weights[links][in_cluster[indices[links]]].sum())
+
         while unvisited:
+            instrument.start("growth")
             # get highest degree node
-            seed = max(unvisited, key=lambda k: (len(data[k]&unvisited),node_index[k]))
+            seed = max(unvisited, key=lambda k: (degrees[k],node_index[k]))
             frontier = data[seed] & unvisited
-            if not frontier: break # no connections left to analyze
-
-            edges,weights = defaultdict(zerodict), defaultdict(int)
-            for a,b in combinations(unvisited, 2):
-                if b not in data[a]: continue 
-                shared = len(data[a] & data[b] & unvisited)
-                edges[a][b],edges[b][a] = shared, shared
-                weights[a] += shared
-                weights[b] += shared
+            if not frontier:
+                instrument.stop("growth")
+                break # no connections left to analyze
 
             max_w,_,node = max((w,node_index[n],n) for n,w in weights.items())
             if max_w > 0:
@@ -75,10 +141,30 @@ class DPCLUS(ClusterAlg):
 
             cluster = set((seed,))
             cluster_degrees = {seed: 0}
+            in_cluster[seed] = True
             nn,ne = 1, 0 # number of nodes, edges in cluster
 
             if verbose:
-                print(seed, end=" ")
+                print(graph.names[seed], end=" ")
+
+            # frontier counters, only updated around every node joining the cluster:
+            # number of edges between node and cluster nodes, sum of their edge
+            # weights, and the cluster node the node was last linked to
+            frontier = set()
+            e_count, w_sum, attached = {}, {}, {}
+            heap = [] # (-e_count, -w_sum, -node index, node), stale entries included
+            def link(p):
+                for n in data[p]:
+                    if n in cluster or n not in unvisited: continue
+                    if n in frontier:
+                        e_count[n] += 1
+                        w_sum[n] += edges[n][p]
+                    else:
+                        frontier.add(n)
+                        e_count[n], w_sum[n] = 1, edges[n][p]
+                    attached[n] = p
+                    heappush(heap, (-e_count[n], -w_sum[n], -node_index[n], n))
+            link(seed)
 
             while frontier:
                 # find higest priority node:
@@ -86,9 +172,14 @@ class DPCLUS(ClusterAlg):
                 # 1. sum of edge weights between node and cluster nodes
                 # 2. the node's index
                 # 3. the node itself
-                e_nk,_,_,p = max((len(data[n] & cluster), sum(edges[n][c] for c in cluster), node_index[n], n) for n in frontier)
-
-                density = 2. * (ne + e_nk) / (nn * (nn+1))
+                while True:
+                    e_nk,w,_,p = heap[0]
+                    if p in frontier and e_count[p] == -e_nk and w_sum[p] == -w: break
+                    heappop(heap)
+                e_nk = -e_nk
+                w_nk = cluster_weight(p) if self.weighted else e_nk
+
+                density = 2. * (ne + w_nk) / (nn * (nn+1))
                 if density < self.d_threshold:
                     break # adding the node gives too low density; cluster is finished
 
@@ -97,32 +188,38 @@ class DPCLUS(ClusterAlg):
                 # connectedness of the attached (cluster) node within the cluster
                 cp = self.cp_threshold
                 if e_nk == 1 and len(cluster) > 1:
-                    print("::")
+                    instrument.count("fine_tuning")
                     n_degree = dict() # node => fine-tuning parameter
-                    for n in frontier:
-                        for c in cluster: # find adjacent cluster node
-                            if n in edges[c]: break
-                        n_degree[n] = len(data[n] & frontier) - cluster_degrees[c]
+                    for n in frontier: # linked to a single cluster node
+                        n_degree[n] = len(data[n] & frontier) - cluster_degrees[attached[n]]
                     p = max(frontier, key=lambda k: (n_degree[k],node_index[k]))
                     if n_degree[p] > 0:
                         cp /= 2.
-                if (e_nk / density / (nn+1)) < cp:
+                    if self.weighted: # the chosen node has a weight of its own
+                        w_nk = cluster_weight(p)
+                        density = 2. * (ne + w_nk) / (nn * (nn+1))
+                        if density < self.d_threshold:
+                            break
+                if (w_nk / density / (nn+1)) < cp:
                     break # no good node found; cluster is finished
 
                 if verbose:
-                    print(p, end=" ")
+                    print(graph.names[p], end=" ")
 
                 # otherwise, add the node to the cluster
                 cluster.add(p)
-                nn,ne = (nn+1), (ne+e_nk)
+                in_cluster[p] = True
+                nn,ne = (nn+1), (ne+w_nk)
 
                 cluster_degrees[p] = e_nk
                 for n in data[p] & cluster:
                     cluster_degrees[n] += 1
 
-                frontier = set.union(*((data[n] - cluster) & unvisited for n in cluster))
+                frontier.discard(p)
+                link(p)
 
             # add overlapping nodes
+            grown = nn
             # frontier[2] stores our fine-tuning parameter, in this case
             frontier_nodes = (set.union(*(data[c] for c in cluster)) - cluster)
             frontier = sorted([len(data[n] & cluster), sum(edges[n][c] for c in cluster), 0, node_index[n], n] for n in frontier_nodes)
@@ -142,15 +239,17 @@ class DPCLUS(ClusterAlg):
                 e_nk,_,w,_,p = frontier.pop()
                 cp = self.cp_threshold  / 2. if fine_tuning and w > 0 else self.cp_threshold
 
-                density = 2. * (ne + e_nk) / (nn * (nn+1))
-                if density < self.d_threshold or (e_nk / density / (nn+1)) < cp: continue
+                w_nk = cluster_weight(p) if self.weighted else e_nk
+                density = 2. * (ne + w_nk) / (nn * (nn+1))
+                if density < self.d_threshold or (w_nk / density / (nn+1)) < cp: continue
 
                 if verbose:
-                    print (p, end=" ")
+                    print (graph.names[p], end=" ")
 
                 # add node to the cluster
                 cluster.add(p)
-                nn,ne = (nn+1), (ne+e_nk)
+                in_cluster[p] = True
+                nn,ne = (nn+1), (ne+w_nk)
 
                 cluster_degrees[p] = e_nk
                 for n in data[p] & cluster:
@@ -161,15 +260,22 @@ class DPCLUS(ClusterAlg):
                     if p in edges[n[4]]:
                         n[0] += 1
 
-            unvisited -= cluster
+            instrument.stop("growth")
+            with instrument.stage("removal"):
+                support.remove(cluster)
+                in_cluster[list(cluster)] = False
 
             num_clusters += 1
+            instrument.count("seeds")
+            instrument.count("grown_nodes", grown)
+            instrument.count("overlap_nodes", nn - grown)
+            instrument.count("clusters")
+            instrument.report("clusters", len(data) - len(unvisited), len(data))
 
             if verbose:
                 print (num_clusters, nn, 2. * ne / nn / (nn-1))
 
-            clusters.append(cluster)
-            self.clusters = clusters
+            yield graph.to_names(cluster)
 
 # if __name__ == '__main__':
 #     filename = "../data/unweighted_example_network.txt"
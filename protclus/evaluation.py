@@ -0,0 +1,98 @@
+# Evaluation of predicted protein complexes against reference complexes
+# Protein memberships of both sides are joined on the protein, which gives all
+# pairwise overlaps at once, as the sparse product of the membership matrices
+
+# Author: Paul Scherer
+# MIT LICENSE
+
+import numpy as np
+
+from .cluster_alg import ClusterAlg
+
+
+def read_complexes(path):
+    """Reads complexes, one complex per line of whitespace separated proteins (the
+    format written by ``save_clusters``)"""
+    with open(path) as fh:
+        return [line.split() for line in fh if line.strip()]
+
+
+def memberships(clusters, index):
+    """Protein id and cluster number of every membership of ``clusters``, and the
+    cluster sizes. Proteins are interned into ``index`` (name => id); repeated
+    proteins within a cluster count once"""
+    proteins, sizes = [], []
+    for cluster in clusters:
+        members = set(cluster)
+        sizes.append(len(members))
+        proteins.extend(index.setdefault(p, len(index)) for p in members)
+    sizes = np.array(sizes, dtype=np.int64)
+    return (np.array(proteins, dtype=np.int64),
+            np.repeat(np.arange(len(sizes)), sizes), sizes)
+
+
+def overlaps(predicted, reference):
+    """Number of proteins shared by every predicted and reference cluster that
+    share any. Returns the predicted and reference cluster numbers and shared
+    protein counts of these pairs, sorted by pair, plus the predicted and
+    reference cluster sizes"""
+    index = {}
+    p_proteins, p_clusters, p_sizes = memberships(predicted, index)
+    r_proteins, r_clusters, r_sizes = memberships(reference, index)
+    n_ref = len(r_sizes)
+
+    # reference memberships grouped by protein, to be joined with every
+    # predicted membership of the same protein
+    order = np.argsort(r_proteins, kind='stable')
+    r_clusters = r_clusters[order]
+    r_count = np.bincount(r_proteins, minlength=len(index))
+    r_start = np.cumsum(r_count) - r_count
+
+    pairs = r_count[p_proteins]
+    first = np.repeat(np.arange(len(p_proteins)), pairs)
+    offset = np.arange(pairs.sum()) - np.repeat(np.cumsum(pairs) - pairs, pairs)
+    keys = p_clusters[first] * n_ref + r_clusters[r_start[p_proteins[first]] + offset]
+    keys, shared = np.unique(keys, return_counts=True)
+    return keys // max(n_ref, 1), keys % max(n_ref, 1), shared, p_sizes, r_sizes
+
+
+def evaluate(predicted, reference, overlap_threshold=0.2):
+    """Standard complex detection metrics of predicted against reference complexes,
+    both given as iterables of protein collections, or a ``ClusterAlg`` after
+    ``cluster()`` for the predictions.
+
+    A predicted and a reference complex match if their overlap score
+    |P & R|**2 / (|P| |R|) reaches ``overlap_threshold``. Precision is the fraction
+    of predictions matching a reference, recall the fraction of references matched
+    by a prediction, and F1 their harmonic mean. Sensitivity, positive predictive
+    value and accuracy (their geometric mean) follow Brohee and van Helden (2006)
+    on the matrix of shared proteins.
+
+    """
+    if isinstance(predicted, ClusterAlg):
+        predicted = predicted.clusters
+    rows, cols, shared, p_sizes, r_sizes = overlaps(predicted, reference)
+
+    score = shared ** 2 / (p_sizes[rows] * r_sizes[cols]).astype(np.float64)
+    matched = score >= overlap_threshold
+    precision = len(np.unique(rows[matched])) / len(p_sizes) if len(p_sizes) else 0.
+    recall = len(np.unique(cols[matched])) / len(r_sizes) if len(r_sizes) else 0.
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.
+
+    best_per_ref = np.zeros(len(r_sizes), dtype=np.int64)
+    np.maximum.at(best_per_ref, cols, shared)
+    best_per_pred = np.zeros(len(p_sizes), dtype=np.int64)
+    np.maximum.at(best_per_pred, rows, shared)
+    sensitivity = best_per_ref.sum() / r_sizes.sum() if r_sizes.sum() else 0.
+    ppv = best_per_pred.sum() / shared.sum() if shared.sum() else 0.
+
+    return {
+        "n_predicted": len(p_sizes),
+        "n_reference": len(r_sizes),
+        "precision": float(precision),
+        "recall": float(recall),
+        "f1": float(f1),
+        "sensitivity": float(sensitivity),
+        "ppv": float(ppv),
+        "accuracy": float(np.sqrt(sensitivity * ppv)),
+    }
@@ -0,0 +1,684 @@
+# Shared graph representation used by all of the clustering algorithms
+# Protein names are interned to integer ids once and adjacency is stored
+# as compact CSR arrays
+
+# Author: Paul Scherer
+# MIT LICENSE
+
+import bz2
+import gzip
+import hashlib
+import json
+import lzma
+import os
+import shutil
+import tempfile
+from operator import itemgetter
+
+import numpy as np
+
+CACHE_VERSION = 2
+CACHE_ARRAYS = ("indptr", "indices", "edges", "weights")
+
+
+def core_numbers(adjacency, nodes=None):
+    """Core number of every node of the subgraph induced by ``nodes`` (default all
+    of them), as a dict, where ``adjacency`` maps node ids to sets of neighbors.
+
+    Uses the bucket algorithm of Batagelj and Zaversnik, linear in the number of
+    edges: nodes are removed in order of their current degree and each removal
+    moves its remaining neighbors down one bucket. A self-loop counts towards the
+    degree of its node, as in ``len(adjacency[v] & nodes)``.
+
+    """
+    nodes = set(range(len(adjacency)) if nodes is None else nodes)
+    degree = dict((v, len(adjacency[v] & nodes)) for v in nodes)
+    buckets = [set() for _ in range(max(degree.values(), default=0) + 1)]
+    for v, d in degree.items():
+        buckets[d].add(v)
+
+    core = {}
+    for d in range(len(buckets)):
+        bucket = buckets[d]
+        while bucket:
+            v = bucket.pop()
+            core[v] = d
+            for u in adjacency[v] & nodes:
+                if u in core or degree[u] <= d:
+                    continue
+                buckets[degree[u]].remove(u)
+                degree[u] -= 1
+                buckets[degree[u]].add(u)
+    return core
+
+
+def _intern(values):
+    """Values of an array as strings in order of first appearance, and the id of
+    every value into them"""
+    uniques, first, inverse = np.unique(values, return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    relabel = np.empty(len(order), dtype=np.int64)
+    relabel[order] = np.arange(len(order))
+    return [str(v) for v in uniques[order].tolist()], relabel[inverse.reshape(-1)]
+
+
+def _open_text(filename):
+    """Text file handle, decompressing ``.gz``, ``.bz2`` and ``.xz`` files on the fly"""
+    opener = {'.gz': gzip.open, '.bz2': bz2.open, '.xz': lzma.open}.get(
+        os.path.splitext(filename)[1].lower(), open)
+    return opener(filename, 'rt')
+
+
+def _file_hash(filename, block_size=1 << 20):
+    sha1 = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+def _file_key(filename):
+    """Absolute path, size and modification time of an input file. Its content
+    hash is only computed when a cache is written or the time no longer matches"""
+    st = os.stat(filename)
+    return {'path': os.path.abspath(filename), 'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+class Graph(object):
+    """Undirected interaction network with protein names interned to integer ids.
+
+    Node ids are assigned in order of first appearance in the edge list (column a
+    before column b on every line) which is the iteration order the original
+    dict based scripts relied upon. Adjacency is held in CSR form: the neighbors
+    of node ``i`` are ``indices[indptr[i]:indptr[i+1]]``, listed in the order in
+    which the interactions were read. ``edges`` keeps the interactions as read,
+    one row per input line, for algorithms that depend on the input column order.
+    For weighted networks ``weights`` holds the confidence of every interaction
+    aligned with ``indices``; it is None for unweighted ones.
+
+    """
+
+    def __init__(self, names, indptr, indices, edges, filename=None, weights=None):
+        self.names = names
+        self.indptr = indptr
+        self.indices = indices
+        self.edges = edges
+        self.weights = weights
+        self.filename = filename
+        self._index = None
+        self._neighbor_sets = None
+        self._edge_support = None
+        self._cache_path = None
+
+    @classmethod
+    def from_edgelist(cls, filename, weighted=False, min_weight=None, cache=False):
+        """Reads a whitespace separated edge list, one interaction per line,
+        optionally compressed as with ``from_table``. Only the first two columns
+        are used, plus the third as the interaction weight with ``weighted``.
+        With ``min_weight`` interactions whose third column is below it are
+        skipped while reading.
+
+        With ``cache`` the parsed graph is also saved in binary form, next to the
+        input (``cache=True``) or in the directory given as ``cache``, and later
+        calls reload it memory-mapped instead of parsing the text again. The cache
+        is keyed by the path, size, modification time and content hash of the
+        input and is rebuilt whenever the input changes.
+
+        """
+        if cache:
+            tag = ('-w' if weighted else '') + ('' if min_weight is None else '-min%r' % min_weight)
+            cache_path = cls._cache_location(filename, None if cache is True else cache) + tag
+            key = _file_key(filename)
+            graph = cls._load_cached(cache_path, filename, key)
+            if graph is None:
+                graph = cls.from_edgelist(filename, weighted, min_weight)
+                graph.save(cache_path, meta=dict(key, sha1=_file_hash(filename),
+                                                 version=CACHE_VERSION))
+                graph._cache_path = cache_path
+            return graph
+
+        weight = 2 if weighted or min_weight is not None else None
+        graph = cls.from_table(filename, 0, 1, weight, min_weight, header=False, comment=None)
+        if not weighted:
+            graph.weights = None
+        return graph
+
+    @classmethod
+    def from_table(cls, filename, source=0, target=1, weight=None, min_weight=None,
+                   delimiter=None, header=None, comment='#'):
+        """Reads the interactions of a multi-column table such as a STRING or
+        BioGRID dump, plain or compressed (``.gz``, ``.bz2``, ``.xz``), streamed
+        line by line so that only the parsed ids are held in memory.
+
+        ``source``, ``target`` and the optional ``weight`` column are given by
+        position or by name in the header line, which is read if ``header`` or,
+        by default, if any column is given by name (a leading ``comment``
+        character is stripped from it). Fields are split on ``delimiter``,
+        whitespace by default, and blank and comment lines are skipped. With
+        ``min_weight`` interactions whose weight is lower are skipped while
+        reading, and their proteins are not interned.
+
+        """
+        columns = [source, target] + ([] if weight is None else [weight])
+        index = {}
+        sources, targets, weights = [], [], []
+        with _open_text(filename) as fh:
+            first_line = 1
+            if header or header is None and any(isinstance(c, str) for c in columns):
+                line = fh.readline().rstrip('\r\n')
+                fields = [f.strip() for f in line.lstrip(comment or '').split(delimiter)]
+                for c in columns:
+                    if isinstance(c, str) and c not in fields:
+                        raise ValueError(f"Column {c!r} is not in the header of {filename}")
+                columns = [fields.index(c) if isinstance(c, str) else c for c in columns]
+                first_line = 2
+
+            pick = itemgetter(*columns)
+            for number, line in enumerate(fh, first_line):
+                if comment and line.startswith(comment) or not line.strip():
+                    continue
+                try:
+                    fields = pick(line.rstrip('\r\n').split(delimiter))
+                    w = None if weight is None else float(fields[2])
+                except (IndexError, ValueError):
+                    raise ValueError(f"Line {number} of {filename} does not have the columns "
+                                     f"{columns}: {line.strip()!r}") from None
+                if w is not None:
+                    if min_weight is not None and w < min_weight:
+                        continue
+                    weights.append(w)
+                sources.append(index.setdefault(fields[0], len(index)))
+                targets.append(index.setdefault(fields[1], len(index)))
+
+        graph = cls.from_arrays(list(index), sources, targets,
+                                None if weight is None else weights, filename=filename)
+        graph._index = index
+        return graph
+
+    @classmethod
+    def from_arrays(cls, names, sources, targets, weights=None, min_weight=None, filename=None):
+        """Builds the graph from parallel arrays of source and target node ids and
+        optionally interaction weights. With ``min_weight`` lighter interactions
+        are dropped; their nodes are kept"""
+        edges = np.empty((len(sources), 2), dtype=np.int32)
+        edges[:, 0] = sources
+        edges[:, 1] = targets
+        return cls._from_edges(names, edges, weights, min_weight, filename)
+
+    @classmethod
+    def _from_edges(cls, names, edges, weights=None, min_weight=None, filename=None):
+        n = len(names)
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            if min_weight is not None:
+                keep = weights >= min_weight
+                edges, weights = edges[keep], weights[keep]
+
+        # every interaction is stored in both directions, interleaved so that
+        # the neighbors of each node keep the order in which they were read
+        src = edges.ravel()
+        dst = edges[:, ::-1].ravel()
+
+        # drop repeated interactions, keeping the first occurrence
+        _, first = np.unique(src.astype(np.int64) * n + dst, return_index=True)
+        first.sort()
+        src, dst = src[first], dst[first]
+
+        order = np.argsort(src, kind='stable')
+        indices = dst[order]
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=indptr[1:])
+        if weights is not None:
+            weights = np.repeat(weights, 2)[first][order]
+        return cls(names, indptr, indices, edges, filename=filename, weights=weights)
+
+    @classmethod
+    def from_edge_array(cls, edges, weights=None, names=None, min_weight=None):
+        """Builds the graph from an array with one interaction per row, e.g. of
+        protein names, optionally with an array of interaction weights. Nodes are
+        named by the values of ``edges`` (as strings), in order of first
+        appearance as with ``from_edgelist``, and only those of interactions kept
+        by ``min_weight``. With ``names``, ``edges`` instead
+        holds node ids into ``names`` and is used as is, without a copy if it is
+        already a contiguous int32 array"""
+        edges = np.asarray(edges)
+        if edges.ndim != 2 or edges.shape[1] != 2:
+            raise ValueError("edge array must have two columns, one interaction per row")
+        if names is None:
+            if weights is not None and min_weight is not None:
+                # dropped before interning, like lines skipped by ``from_edgelist``
+                weights = np.asarray(weights, dtype=np.float64)
+                keep = weights >= min_weight
+                edges, weights = edges[keep], weights[keep]
+            names, ids = _intern(edges.ravel())
+            edges = ids.reshape(-1, 2)
+        return cls._from_edges(list(names), np.ascontiguousarray(edges, dtype=np.int32),
+                               weights, min_weight)
+
+    @classmethod
+    def from_sparse(cls, matrix, names=None, weighted=False, min_weight=None):
+        """Builds the graph from a square sparse adjacency matrix, anything with a
+        ``tocoo`` method such as the SciPy sparse types. Node ``i`` is named
+        ``names[i]``, or ``str(i)`` by default, so nodes without interactions are
+        kept. Every stored non-zero entry is an interaction, the entries of a
+        symmetric matrix counting once, read in row-major order. With ``weighted``
+        the entries are the interaction weights, and with ``min_weight`` lighter
+        interactions are dropped"""
+        coo = matrix.tocoo()
+        n = coo.shape[0]
+        if coo.shape[1] != n:
+            raise ValueError("adjacency matrix must be square")
+        rows, cols, data = np.asarray(coo.row), np.asarray(coo.col), np.asarray(coo.data)
+        keep = data != 0
+        if min_weight is not None:
+            keep &= data >= min_weight
+        rows, cols, data = rows[keep], cols[keep], data[keep]
+        order = np.lexsort((cols, rows))
+        rows, cols, data = rows[order], cols[order], data[order]
+        pairs = np.minimum(rows, cols).astype(np.int64) * n + np.maximum(rows, cols)
+        _, first = np.unique(pairs, return_index=True)
+        first.sort()
+        names = [str(i) for i in range(n)] if names is None else list(names)
+        return cls.from_arrays(names, rows[first], cols[first],
+                               data[first] if weighted else None)
+
+    @classmethod
+    def from_networkx(cls, graph, weight=None, min_weight=None):
+        """Builds the graph from a NetworkX graph, with its nodes (as strings) in
+        the order of ``graph.nodes`` and its interactions in that of
+        ``graph.edges``. With ``weight`` the edge attribute of that name is read
+        as the interaction weight, 1 where missing"""
+        names = list(graph)
+        index = dict((v, i) for i, v in enumerate(names))
+        if weight is None:
+            edges, weights = list(graph.edges()), None
+        else:
+            edges = list(graph.edges(data=weight, default=1.))
+            weights = np.fromiter((e[2] for e in edges), dtype=np.float64, count=len(edges))
+        sources = np.fromiter((index[e[0]] for e in edges), dtype=np.int64, count=len(edges))
+        targets = np.fromiter((index[e[1]] for e in edges), dtype=np.int64, count=len(edges))
+        return cls.from_arrays([str(v) for v in names], sources, targets, weights, min_weight)
+
+    @classmethod
+    def from_dataframe(cls, frame, source=0, target=1, weight=None, min_weight=None):
+        """Builds the graph from an edge table such as a pandas DataFrame, one
+        interaction per row. Columns are given by name, or by position if there is
+        no column of that name; ``weight`` is the optional weight column"""
+        def column(key):
+            if key in frame.columns:
+                return np.asarray(frame[key])
+            return np.asarray(frame.iloc[:, key])
+
+        weights = None if weight is None else column(weight).astype(np.float64)
+        return cls.from_edge_array(np.column_stack([column(source), column(target)]),
+                                   weights, min_weight=min_weight)
+
+    @classmethod
+    def from_data(cls, data, weighted=False, min_weight=None):
+        """Graph of a network given in any supported form: a ``Graph`` (returned as
+        is, so without ``min_weight``), the path of an edge list, a sparse
+        adjacency matrix, a NetworkX graph, an edge table or an edge array. As with
+        edge list files, the third column of tables and arrays (or the ``weight``
+        attribute of NetworkX edges) holds the interaction weights, read if
+        ``weighted`` or to apply ``min_weight``"""
+        if isinstance(data, Graph):
+            if min_weight is not None:
+                raise ValueError("min_weight is applied while a network is read, "
+                                 "load the graph with min_weight instead")
+            return data
+        if isinstance(data, (str, os.PathLike)):
+            return cls.from_edgelist(data, weighted, min_weight)
+        use_weights = weighted or min_weight is not None
+        if hasattr(data, 'tocoo'):
+            return cls.from_sparse(data, weighted=weighted, min_weight=min_weight)
+        if hasattr(data, 'adj') and hasattr(data, 'edges'):
+            graph = cls.from_networkx(data, 'weight' if use_weights else None, min_weight)
+        elif hasattr(data, 'columns') and hasattr(data, 'iloc'):
+            graph = cls.from_dataframe(data, 0, 1, 2 if use_weights else None, min_weight)
+        else:
+            data = np.asarray(data)
+            weights = data[:, 2].astype(np.float64) if use_weights else None
+            graph = cls.from_edge_array(data[:, :2], weights, min_weight=min_weight)
+        if not weighted:
+            graph.weights = None
+        return graph
+
+    def save(self, path, meta=None):
+        """Saves the graph as a directory of ``.npy`` arrays that ``load`` can
+        memory-map. The directory is written next to ``path`` and moved in place
+        once complete, so concurrent readers never see a partial graph"""
+        parent = os.path.dirname(os.path.abspath(path))
+        os.makedirs(parent, exist_ok=True)
+        tmp = tempfile.mkdtemp(dir=parent, prefix='.tmp-graph-')
+        try:
+            np.save(os.path.join(tmp, 'names.npy'), np.array(self.names, dtype=str))
+            for name in CACHE_ARRAYS:
+                if getattr(self, name) is not None:
+                    np.save(os.path.join(tmp, name + '.npy'), np.ascontiguousarray(getattr(self, name)))
+            with open(os.path.join(tmp, 'meta.json'), 'w') as fh:
+                json.dump(meta or {}, fh)
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            os.replace(tmp, path)
+        except BaseException:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+
+    @classmethod
+    def load(cls, path, mmap=True, filename=None):
+        """Loads a graph written by ``save``, memory-mapping its arrays unless
+        ``mmap`` is False"""
+        names = np.load(os.path.join(path, 'names.npy')).tolist()
+        graph = cls(names, None, None, None, filename=filename)
+        graph._load_arrays(path, 'r' if mmap else None)
+        if mmap:
+            graph._cache_path = path
+        return graph
+
+    @staticmethod
+    def _cache_location(filename, cache_dir=None):
+        path = os.path.abspath(filename)
+        if cache_dir is None:
+            return path + '.protclus-cache'
+        digest = hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+        return os.path.join(cache_dir, '%s-%s' % (os.path.basename(path), digest))
+
+    @classmethod
+    def _load_cached(cls, cache_path, filename, key):
+        try:
+            with open(os.path.join(cache_path, 'meta.json')) as fh:
+                meta = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if meta.get('version') != CACHE_VERSION or meta.get('path') != key['path'] \
+                or meta.get('size') != key['size']:
+            return None
+        if meta.get('mtime_ns') != key['mtime_ns']:
+            # touched but possibly unchanged: only trust the cache on equal content
+            if meta.get('sha1') != _file_hash(filename):
+                return None
+            # replaced as a whole, like the graph itself, so that concurrent
+            # readers never see a partial file
+            meta['mtime_ns'] = key['mtime_ns']
+            fd, tmp = tempfile.mkstemp(dir=cache_path, prefix='.tmp-meta-')
+            try:
+                with os.fdopen(fd, 'w') as fh:
+                    json.dump(meta, fh)
+                os.replace(tmp, os.path.join(cache_path, 'meta.json'))
+            except BaseException:
+                os.remove(tmp)
+                raise
+        try:
+            return cls.load(cache_path, filename=filename)
+        except (OSError, ValueError):
+            return None
+
+    def __getstate__(self):
+        # the python side caches are cheaper to rebuild than to pickle, and a
+        # memory-mapped graph is reopened from its cache by every worker process
+        # so that they share the pages instead of each holding a private copy
+        state = self.__dict__.copy()
+        state['_index'] = state['_neighbor_sets'] = None
+        if state.get('_cache_path'):
+            for name in CACHE_ARRAYS:
+                state[name] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if state.get('_cache_path'):
+            self._load_arrays(state['_cache_path'], 'r')
+
+    def _load_arrays(self, path, mmap_mode):
+        for name in CACHE_ARRAYS:
+            filename = os.path.join(path, name + '.npy')
+            setattr(self, name, np.load(filename, mmap_mode=mmap_mode)
+                    if os.path.exists(filename) else None)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __str__(self):
+        return (f"Graph with {self.n_nodes} nodes and {self.n_edges} edges")
+
+    @property
+    def n_nodes(self):
+        return len(self.names)
+
+    @property
+    def n_edges(self):
+        rows = np.repeat(np.arange(self.n_nodes), self.degree())
+        loops = int(np.count_nonzero(rows == self.indices))
+        return (len(self.indices) + loops) // 2
+
+    @property
+    def index(self):
+        """Mapping from protein name to node id"""
+        if self._index is None:
+            self._index = dict((name, i) for i, name in enumerate(self.names))
+        return self._index
+
+    def degree(self):
+        """Array with the degree of every node"""
+        return np.diff(self.indptr)
+
+    @property
+    def weighted(self):
+        return self.weights is not None
+
+    def induced_weight(self, nodes):
+        """Total weight of the edges among ``nodes``, every edge counted from both
+        of its endpoints (a self-loop once), like ``sum(len(data[n] & nodes))`` on
+        an unweighted graph"""
+        nodes = np.fromiter(nodes, dtype=np.int64)
+        starts, stops = self.indptr[nodes], self.indptr[nodes + 1]
+        lengths = stops - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        inside = np.isin(self.indices[positions], nodes)
+        weights = self.weights if self.weights is not None else np.ones(len(self.indices))
+        return float(weights[positions[inside]].sum())
+
+    def neighbors(self, node):
+        """Array of the neighbors of a node id"""
+        return self.indices[self.indptr[node]:self.indptr[node + 1]]
+
+    def neighbor_sets(self):
+        """List of python sets with the neighbors of each node id, built once
+        and cached on the graph. The sets are shared and must not be modified"""
+        if self._neighbor_sets is None:
+            indptr, indices = self.indptr.tolist(), self.indices.tolist()
+            self._neighbor_sets = [set(indices[indptr[i]:indptr[i + 1]])
+                                   for i in range(self.n_nodes)]
+        return self._neighbor_sets
+
+    def edge_support(self):
+        """Array with the number of common neighbors of the two endpoints of every
+        edge, aligned with ``indices``. Built once from the triangles of the graph
+        and cached. Self-loops count as common neighbors, as in the set based
+        ``len(data[a] & data[b])``, and the entries of the loops themselves are 0"""
+        if self._edge_support is None:
+            self._edge_support = self._count_support()
+        return self._edge_support
+
+    def node_support(self):
+        """Array with the sum of the edge support over the edges of every node"""
+        rows = np.repeat(np.arange(self.n_nodes), self.degree())
+        return np.bincount(rows, weights=self.edge_support(),
+                           minlength=self.n_nodes).astype(np.int64)
+
+    def _count_support(self, chunk_size=1 << 22):
+        n = self.n_nodes
+        degree = self.degree()
+        rows = np.repeat(np.arange(n, dtype=np.int64), degree)
+        cols = self.indices.astype(np.int64)
+        loops = np.zeros(n, dtype=np.int64)
+        loops[rows[rows == cols]] = 1
+
+        # orient every edge from lower to higher (degree, id) rank so that each
+        # triangle is found exactly once, from its lowest ranked node
+        rank = np.empty(n, dtype=np.int64)
+        rank[np.lexsort((np.arange(n), degree))] = np.arange(n)
+        forward = rank[rows] < rank[cols]
+        src, dst = rows[forward], cols[forward]
+        order = np.lexsort((dst, src))
+        src, dst = src[order], dst[order]
+        keys = np.minimum(src, dst) * n + np.maximum(src, dst)
+        edge_order = np.argsort(keys)
+        sorted_keys = keys[edge_order]
+        counts = np.zeros(len(keys), dtype=np.int64)
+
+        # every pair of out-neighbors of a node is a wedge, closed if the pair is
+        # itself an edge. Wedges are generated a block of nodes at a time
+        out_indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=out_indptr[1:])
+        later = out_indptr[src + 1] - np.arange(len(src)) - 1 # wedges per position
+        wedge_indptr = np.zeros(len(src) + 1, dtype=np.int64)
+        np.cumsum(later, out=wedge_indptr[1:])
+        start = 0
+        while start < len(src):
+            stop = int(np.searchsorted(wedge_indptr, wedge_indptr[start] + chunk_size,
+                                       side='right')) - 1
+            stop = min(max(stop, start + 1), len(src))
+            num = later[start:stop]
+            first = np.repeat(np.arange(start, stop), num)
+            block_start = np.repeat(wedge_indptr[start:stop] - wedge_indptr[start], num)
+            second = first + 1 + np.arange(len(first)) - block_start
+            a, b = dst[first], dst[second]
+            wedge_keys = np.minimum(a, b) * n + np.maximum(a, b)
+            pos = np.searchsorted(sorted_keys, wedge_keys)
+            pos[pos == len(sorted_keys)] = 0
+            closed = sorted_keys[pos] == wedge_keys
+            for edges in (first[closed], second[closed], edge_order[pos[closed]]):
+                counts += np.bincount(edges, minlength=len(keys))
+            start = stop
+
+        # map the counts back onto both directions of every edge
+        support = np.zeros(len(cols), dtype=np.int64)
+        proper = rows != cols
+        r, c = rows[proper], cols[proper]
+        pos = np.searchsorted(sorted_keys, np.minimum(r, c) * n + np.maximum(r, c))
+        support[proper] = counts[edge_order[pos]] + loops[r] + loops[c]
+        return support
+
+    def components(self):
+        """Array with the connected component of every node id. Components are
+        numbered in order of their lowest node id, i.e. the order in which their
+        first node was read. Labels are spread by repeatedly taking the lowest
+        label among neighbors and following labels to their own labels"""
+        n = self.n_nodes
+        rows = np.repeat(np.arange(n), self.degree())
+        labels = np.arange(n)
+        while True:
+            lowest = labels.copy()
+            np.minimum.at(lowest, rows, labels[self.indices])
+            lowest = lowest[lowest]
+            if np.array_equal(lowest, labels):
+                break
+            labels = lowest
+        return np.unique(labels, return_inverse=True)[1].reshape(-1)
+
+    def edge_weights(self):
+        """Array with the weight of every interaction in ``edges``, as stored in the
+        graph (that of the first occurrence for repeated interactions), or None for
+        unweighted graphs"""
+        if self.weights is None:
+            return None
+        n = self.n_nodes
+        rows = np.repeat(np.arange(n, dtype=np.int64), self.degree())
+        keys = rows * n + self.indices
+        order = np.argsort(keys, kind='stable')
+        pos = np.searchsorted(keys[order], self.edges[:, 0].astype(np.int64) * n + self.edges[:, 1])
+        return np.asarray(self.weights)[order[pos]]
+
+    def apply_delta(self, added=(), removed=()):
+        """New graph with interactions added and removed, given as pairs of protein
+        names, or (a, b, weight) triples for added interactions of a weighted
+        graph. Removing an interaction removes it in both directions, pairs that
+        are not in the graph are ignored. Node ids are kept, even for proteins left
+        without interactions, and new proteins are appended in order of appearance;
+        added interactions are read after the remaining ones"""
+        names, index = list(self.names), dict(self.index)
+        n = len(names)
+        keys = self.edges[:, 0].astype(np.int64) * n + self.edges[:, 1]
+        drop = [index[a] * n + index[b] for a, b in removed if a in index and b in index]
+        drop = np.array(drop + [k % n * n + k // n for k in drop], dtype=np.int64)
+        keep = ~np.isin(keys, drop)
+
+        sources, targets, weights = [], [], []
+        for edge in added:
+            a, b = edge[:2]
+            if self.weighted:
+                if len(edge) < 3:
+                    raise ValueError(f"Interaction {a} {b} added to a weighted graph has no weight")
+                weights.append(float(edge[2]))
+            sources.append(index.setdefault(a, len(index)))
+            targets.append(index.setdefault(b, len(index)))
+        names.extend(list(index)[n:])
+
+        edge_weights = self.edge_weights()
+        graph = type(self).from_arrays(
+            names, np.concatenate([self.edges[keep, 0], np.array(sources, dtype=np.int64)]),
+            np.concatenate([self.edges[keep, 1], np.array(targets, dtype=np.int64)]),
+            None if edge_weights is None else np.concatenate([edge_weights[keep], weights]),
+            filename=self.filename)
+        graph._index = index
+        return graph
+
+    def split_components(self):
+        """List of the connected components as graphs of their own, in component
+        order. Nodes keep their relative order, and neighbors and interactions the
+        order in which they were read, so node ids and tie-breaking are consistent
+        with the whole graph"""
+        labels = self.components()
+        n_components = int(labels.max()) + 1 if len(labels) else 0
+        node_order = np.argsort(labels, kind='stable')
+        node_starts = np.zeros(n_components + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels, minlength=n_components), out=node_starts[1:])
+        relabel = np.empty(self.n_nodes, dtype=np.int64)
+        relabel[node_order] = np.arange(self.n_nodes) - node_starts[labels[node_order]]
+
+        # adjacency rows, weights and interactions grouped by component
+        degree = self.degree()[node_order]
+        starts = self.indptr[node_order]
+        positions = np.repeat(starts - np.cumsum(degree) + degree, degree) + np.arange(degree.sum())
+        indices = relabel[self.indices[positions]].astype(self.indices.dtype)
+        weights = None if self.weights is None else np.asarray(self.weights[positions])
+        link_starts = np.zeros(self.n_nodes + 1, dtype=np.int64)
+        np.cumsum(degree, out=link_starts[1:])
+        edge_order = np.argsort(labels[self.edges[:, 0]], kind='stable')
+        edges = relabel[self.edges[edge_order]].astype(self.edges.dtype)
+        edge_starts = np.zeros(n_components + 1, dtype=np.int64)
+        np.cumsum(np.bincount(labels[self.edges[:, 0]], minlength=n_components), out=edge_starts[1:])
+
+        graphs = []
+        for c in range(n_components):
+            a, b = node_starts[c], node_starts[c + 1]
+            links = slice(link_starts[a], link_starts[b])
+            graphs.append(type(self)(
+                [self.names[i] for i in node_order[a:b].tolist()],
+                link_starts[a:b + 1] - link_starts[a], indices[links],
+                edges[edge_starts[c]:edge_starts[c + 1]], filename=self.filename,
+                weights=None if weights is None else weights[links]))
+        return graphs
+
+    def core_numbers(self, nodes=None):
+        """Core number of every node id, or of the subgraph induced by ``nodes``"""
+        return core_numbers(self.neighbor_sets(), nodes)
+
+    def py27_adjacency(self):
+        """Name keyed py27hash ``Dict`` of ``Set`` neighbors, filled in the same
+        insertion order as the original Python 2 scripts so that iteration follows
+        the Python 2.7 ordering"""
+        from py27hash.dict import Dict
+        from py27hash.set import Set
+
+        names = self.names
+        indptr, indices = self.indptr.tolist(), self.indices.tolist()
+        data = Dict()
+        for i, name in enumerate(names):
+            data[name] = Set([names[j] for j in indices[indptr[i]:indptr[i + 1]]])
+        return data
+
+    def to_names(self, nodes):
+        """Maps an iterable of node ids back to a set of protein names"""
+        names = self.names
+        return set(names[i] for i in nodes)
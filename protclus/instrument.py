@@ -0,0 +1,90 @@
+# Instrumentation of clustering runs
+# Stage timers, counters and progress callbacks, silent unless asked otherwise
+
+# Author: Paul Scherer
+# MIT LICENSE
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+class Instrument(object):
+    """Collects the wall-clock time of every stage and counters of a clustering
+    run, and hands progress on to ``progress`` if given, as
+    ``progress(stage, done, total)``. Every algorithm has one; it never prints.
+
+    Subclass it to log or export metrics elsewhere: algorithms only call
+    ``stage`` (or ``start`` and ``stop``), ``count`` and ``report``. Counters
+    are added up by the algorithms outside of their innermost loops, so the
+    overhead stays negligible.
+
+    """
+
+    def __init__(self, progress=None):
+        self.progress = progress
+        self.reset()
+
+    def reset(self):
+        """Forgets the timings and counters of earlier runs"""
+        self.timings = defaultdict(float) # stage => seconds
+        self.counters = defaultdict(int) # counter => count
+        self._started = {} # stage => start time of the running stage
+
+    def start(self, name):
+        self._started[name] = time.perf_counter()
+
+    def stop(self, name):
+        """Adds the time since ``start`` to the time of stage ``name``"""
+        self.timings[name] += time.perf_counter() - self._started.pop(name)
+
+    @contextmanager
+    def stage(self, name):
+        """Times the enclosed block, adding it to the time of stage ``name``"""
+        self.start(name)
+        try:
+            yield
+        finally:
+            self.stop(name)
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def report(self, stage, done, total=None):
+        if self.progress is not None:
+            self.progress(stage, done, total)
+
+    def merge(self, metrics):
+        """Adds the timings and counters of another run, as given by ``metrics``"""
+        for name, seconds in metrics["timings"].items():
+            self.timings[name] += seconds
+        for name, n in metrics["counters"].items():
+            self.counters[name] += n
+
+    @property
+    def metrics(self):
+        """Timings and counters collected so far, as plain dicts"""
+        return {"timings": dict(self.timings), "counters": dict(self.counters)}
+
+
+class TqdmProgress(object):
+    """Progress callback showing a tqdm progress bar per stage"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.bar, self.stage = None, None
+
+    def __call__(self, stage, done, total=None):
+        from tqdm import tqdm
+
+        if stage != self.stage:
+            self.close()
+            self.bar, self.stage = tqdm(desc=stage, total=total, **self.kwargs), stage
+        self.bar.update(done - self.bar.n)
+        if total is not None and done >= total:
+            self.close()
+
+    def close(self):
+        if self.bar is not None:
+            self.bar.close()
+        self.bar, self.stage = None, None
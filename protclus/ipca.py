@@ -6,10 +6,7 @@
 # Python 3 protclus version: Paul Scherer
 
 import sys
-from itertools import combinations
 from collections import defaultdict
-from py27hash.dict import Dict
-from py27hash.set import Set
 
 from .cluster_alg import ClusterAlg
 
@@ -17,87 +14,151 @@ class IPCA(ClusterAlg):
     """
     Class for running and administrating the IPCA clustering algorithm
 
+    ``order`` decides how ties are broken wherever the algorithm depends on node
+    order. With the default ``"read"`` seeds of equal weight and degree are taken
+    in the order in which the nodes were read, a seed's first neighbor is the
+    first one read and frontier nodes with equally many edges into the cluster
+    are added earliest read first, so results are the same across runs and
+    interpreters. ``"py27"`` instead reproduces the Python 2.7 set and dict
+    iteration of the original script exactly (this needs py27hash). Clusters
+    are tuples of names in read order, or with ``"py27"`` the script's ``Set``
+    of names, so saved clusters list their proteins in the same order too.
+
     """
 
-    def __init__(self, filename, t_in=0.5):
-        super(IPCA, self).__init__(filename)
+    def __init__(self, filename, t_in=0.5, order="read", min_weight=None, instrument=None):
+        super(IPCA, self).__init__(filename, min_weight=min_weight, instrument=instrument)
+        if order not in ("read", "py27"):
+            raise ValueError(f"Unknown node order {order!r}, expected 'read' or 'py27'")
         self.t_in = t_in
+        self.order = order
+
+    def node_order(self):
+        """Seed iteration order, first neighbor and frontier tie-breaking rank of
+        every node id for the chosen ``order``"""
+        graph = self.graph
+        if self.order == "py27":
+            data = graph.py27_adjacency() # protein => neighboring proteins
+            index = graph.index
+            nodes = [index[k] for k in data]
+            first_neighbor = [None] * len(graph)
+            for k in data:
+                first_neighbor[index[k]] = index[next(iter(data[k]))]
+            # the original script compares protein names on ties
+            rank = [0] * len(graph)
+            for r, n in enumerate(sorted(range(len(graph)), key=graph.names.__getitem__)):
+                rank[n] = r
+        else:
+            nodes = range(len(graph))
+            indptr, indices = graph.indptr.tolist(), graph.indices.tolist()
+            first_neighbor = [indices[indptr[n]] if indptr[n] < indptr[n + 1] else n
+                              for n in nodes]
+            rank = [-n for n in nodes]
+        return nodes, first_neighbor, rank
+
+    def _component_alg(self, graph):
+        if self.order == "py27":
+            raise ValueError("py27 order depends on the whole network, components are clustered in read order only")
+        return super(IPCA, self)._component_alg(graph)
 
     def cluster(self, verbose=False):
-        # data = defaultdict(Set) # node id => neighboring node ids
-
-        data = Dict()
-        # read in graph
-        with open(self.filename, 'r') as f:
-            counter = 0
-            for line in f:
-                a,b = line.split()[:2]
-                counter += 1
-                if a in data:
-                    data[a].add(b)
-                else:
-                    data[a] = Set()
-                    data[a].add(b)
-                if b in data:
-                    data[b].add(a)
-                else:
-                    data[b] = Set()
-                    data[b].add(a)
-
-        # weights = defaultdict(int)
-        weights = Dict()
-        for a,b in combinations(data, 2):
-            if b not in data[a]: continue   
-            shared = len(data[a] & data[b])
-            if a in weights:
-                weights[a] += shared
-            else:
-                weights[a] = 0
-                weights[a] += shared
-            if b in weights:
-                weights[b] += shared
-            else:
-                weights[b] = 0
-                weights[b] += shared
+        self.clusters = list(self.iter_clusters(verbose))
 
-        unvisited = Set(data)
-        num_clusters = 0
-        clusters = []
-        
-        # print(unvisited)
-        # return 0
+    def iter_clusters(self, verbose=False):
+        graph = self.graph
+        instrument = self.instrument
+        instrument.reset()
+        data = graph.neighbor_sets() # node id => neighboring node ids
+
+        with instrument.stage("weighting"):
+            nodes, first_neighbor, rank = self.node_order()
+
+            # node weights: the sum over the edges of every node of the number of
+            # neighbors shared by both endpoints (twice the triangles through the node)
+            weights = graph.node_support().tolist()
+
+            seed_nodes = sorted(nodes, key=lambda k: (weights[k],len(data[k])), reverse=True)
 
-        # Potential culprit
-        seed_nodes = sorted(data, key=lambda k: (weights[k],len(data[k])), reverse=True)
+        # nodes without neighbors are in no cluster
+        unvisited = set(n for n in range(len(data)) if data[n])
+        n_clustered = len(unvisited)
+        num_clusters = 0
 
         for seed in seed_nodes: # get highest degree node
             if seed not in unvisited: continue
-
-            cluster = Set((seed,next(iter(data[seed])))) # seed and random neighbor
+            instrument.start("expansion")
+
+            # frontier bookkeeping, only updated around every node joining the cluster:
+            # number of cluster nodes adjacent to a frontier node and frontier nodes
+            # by that number
+            cluster, members = set(), [] # cluster nodes, in joining order
+            m_v, by_m = {}, defaultdict(set)
+            def join(x):
+                cluster.add(x)
+                members.append(x)
+                if x in m_v:
+                    by_m[m_v.pop(x)].discard(x)
+                for p in data[x]:
+                    if p in cluster: continue
+                    if p in m_v:
+                        by_m[m_v[p]].discard(p)
+                        m_v[p] += 1
+                    else:
+                        m_v[p] = 1
+                    by_m[m_v[p]].add(p)
+
+            # cluster nodes within distance 2 of a candidate through the cluster,
+            # brought up to date with the nodes that joined since its last check
+            reach = {} # candidate => (number of members checked, reached members)
+            checks = 0
+            def within_2(p):
+                nonlocal checks
+                checks += 1
+                checked, reached = reach.get(p, (0, set()))
+                p_neighbors = data[p] & cluster
+                for y in members[checked:]:
+                    if y in p_neighbors:
+                        reached.add(y)
+                        reached |= data[y] & cluster
+                    elif not data[y].isdisjoint(p_neighbors):
+                        reached.add(y)
+                reach[p] = (len(members), reached)
+                return len(reached) == len(cluster)
+
+            join(seed) # seed and first neighbor
+            if first_neighbor[seed] != seed:
+                join(first_neighbor[seed])
 
             while True:
                 # rank neighbors by the number of edges between the node and cluster nodes
-                frontier = sorted((len(data[p] & cluster),p) for p in
-                    Set.union(*((data[n] - cluster) for n in cluster)))
-
                 # do this until IN_vk < T_IN, SP <= 2 is met, or no frontier nodes left
                 found = False
-                while frontier and not found:
-                    m_vk,p = frontier.pop()
+                for m_vk in range(len(cluster), 0, -1):
                     if m_vk < self.t_in * len(cluster): break
-                    c_2neighbors = data[p] & cluster
-                    c_2neighbors.update(*(data[c] & cluster for c in c_2neighbors))
-                    if cluster == c_2neighbors:
-                        found = True
-                        break
+                    for p in sorted(by_m[m_vk], key=rank.__getitem__, reverse=True):
+                        if within_2(p):
+                            found = True
+                            break
+                    if found: break
 
                 if not found: break
-                    
+
                 # otherwise, add the node to the cluster
-                cluster.add(p)
+                join(p)
 
             unvisited -= cluster
-
+            instrument.stop("expansion")
+            instrument.count("seeds")
+            instrument.count("sp_checks", checks)
+            instrument.count("clusters")
+            instrument.report("clusters", n_clustered - len(unvisited), n_clustered)
+
+            if self.order == "py27":
+                # names in the iteration order of the original script's cluster Set
+                from py27hash.set import Set
+                cluster = Set(graph.names[x] for x in members)
+            else:
+                cluster = tuple(graph.names[x] for x in sorted(cluster))
             if verbose:
                 print (' '.join(cluster))
 
@@ -106,12 +167,10 @@ class IPCA(ClusterAlg):
             if verbose:
                 print (num_clusters, len(cluster), len(unvisited))
 
-            clusters.append(cluster)
+            yield cluster
 
             if not unvisited: break
 
-        self.clusters = clusters
-
 # if __name__ == '__main__':
 #     filename = "../data/unweighted_example_network.txt"
 #     c = IPCA(filename)
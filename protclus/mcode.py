@@ -5,92 +5,227 @@
 # Python 3 protclus version: Paul Scherer
 
 import sys
-from collections import defaultdict
 
 from .cluster_alg import ClusterAlg
+from .graph import core_numbers
+from .parallel import chunk_size, resolve_jobs, worker_pool, worker_state
+
+
+def vertex_weight(edges, v, graph=None):
+    """Stage 1 weight of a vertex: the highest k-core number of its neighborhood
+    times the density of that k-core. Given a weighted ``graph`` the density is
+    weighted, i.e. the total interaction weight rather than the edge count"""
+    neighborhood = set((v,)) | edges[v]
+    # if node has only one neighbor, we know everything we need to know
+    if len(neighborhood) <= 2:
+        return 1.
+
+    # highest k-core of the neighborhood
+    core = core_numbers(edges, neighborhood)
+    k = max(core.values())
+    k_core = set(n for n in neighborhood if core[n] >= k)
+
+    # vertex weight = k-core number * density of k-core
+    if graph is not None and graph.weighted:
+        internal = graph.induced_weight(k_core)
+    else:
+        internal = sum(len(edges[n] & k_core) for n in k_core)
+    return k * (internal / (2. * len(k_core)**2))
+
+
+# graph being weighted and its adjacency, in every worker process
+def _weighting_state(graph, weighted):
+    return {"graph": graph if weighted else None, "edges": graph.neighbor_sets()}
+
+def _weigh_range(bounds):
+    edges, graph = worker_state["edges"], worker_state["graph"]
+    return [vertex_weight(edges, v, graph) for v in range(*bounds)]
+
+def vertex_weights(graph, n_jobs=1, weighted=False):
+    """Stage 1 weights of all node ids, using weighted densities if ``weighted``.
+    With ``n_jobs`` > 1 (or -1 for all cpus) contiguous ranges of node ids are
+    weighted in a pool of worker processes that each hold the graph read-only;
+    the result is identical to the serial one"""
+    n = len(graph)
+    n_jobs = resolve_jobs(n_jobs)
+    if n_jobs <= 1 or n < 2:
+        edges = graph.neighbor_sets()
+        weighted_graph = graph if weighted else None
+        return [vertex_weight(edges, v, weighted_graph) for v in range(n)]
+
+    step = chunk_size(n, n_jobs)
+    chunks = [(i, min(i + step, n)) for i in range(0, n, step)]
+    with worker_pool(n_jobs, _weighting_state, (graph, weighted)) as pool:
+        weights = []
+        for part in pool.imap(_weigh_range, chunks):
+            weights.extend(part)
+    return weights
+
+
+def predict_complexes(edges, weights, weight_threshold, instrument=None):
+    """Stage 2 and haircut: grows a complex from every unvisited seed in order of
+    decreasing weight, over neighbors weighing more than ``weight_threshold`` (a
+    fraction, 1 - the MCODE vertex weight percentage) of the seed. Yields the seed
+    and node ids of every complex that is a 2-core. Seeds and nodes cut off by the
+    haircut are counted by ``instrument`` if given"""
+    unvisited = set(range(len(edges)))
+
+    # ties keep node id order, i.e. the order in which nodes were read
+    for seed in sorted(range(len(edges)), key=weights.__getitem__, reverse=True):
+        if seed not in unvisited:
+            continue
+
+        cluster, frontier = set((seed,)), set((seed,))
+        w = weights[seed] * weight_threshold
+        while frontier:
+            cluster.update(frontier)
+            unvisited -= frontier
+            frontier = set(n for n in set.union(
+                *(edges[n] for n in frontier)) & unvisited if weights[n] > w)
+
+        # Haircut: only keep 2-core complexes
+        core = core_numbers(edges, cluster)
+        grown = len(cluster)
+        cluster = set(n for n in cluster if core[n] >= 2)
+        if instrument is not None:
+            instrument.count("seeds")
+            instrument.count("haircut_nodes", grown - len(cluster))
+            instrument.report("prediction", len(edges) - len(unvisited), len(edges))
+
+        if cluster:
+            # fluff never really seems to improve anything...
+            # cluster.update(
+            # n for n in set.union(*(edges[c] for c in cluster)) & unvisited
+            # if densities[n] > FLUFF_THRESHOLD)
+            yield seed, cluster
+
+
+# graph and stage 1 weights, in every threshold sweep worker
+def _sweep_state(graph, weights):
+    return {"graph": graph, "weights": weights}
+
+def _sweep_threshold(weight_threshold):
+    graph = worker_state["graph"]
+    return [graph.to_names(cluster) for _, cluster in
+            predict_complexes(graph.neighbor_sets(), worker_state["weights"], 1 - weight_threshold)]
 
 
 class MCODE(ClusterAlg):
-    """Class for running and administrating Bader et al.'s MCODE algorithm"""
+    """Class for running and administrating Bader et al.'s MCODE algorithm
 
-    def __init__(self, filename, weight_threshold=0.2):
-        super(MCODE, self).__init__(filename)
-        self.weight_threshold = 1 - weight_threshold
-
-    def cluster(self):
-        edges = defaultdict(set)  # node id => neighboring node ids
+    ``n_jobs`` sets the number of worker processes used for the vertex weighting
+    stage and threshold sweeps (-1 for all cpus). With ``weighted`` vertices are
+    weighted by the weighted density of their highest k-core
 
-        # Read edgelist
-        with open(self.filename, 'r') as f:
-            for line in f:
-                a, b = line.split()[:2]
-                edges[a].add(b)
-                edges[b].add(a)
-        print ('## Input graph loaded; %i nodes' % (len(edges),))
+    """
 
-        # Clusters list
-        clusters = []
+    def __init__(self, filename, weight_threshold=0.2, n_jobs=1, weighted=False, min_weight=None,
+                 instrument=None):
+        super(MCODE, self).__init__(filename, weighted, min_weight, instrument)
+        self.weight_threshold = 1 - weight_threshold
+        self.n_jobs = n_jobs
+        self._weights = None
+
+    def vertex_weights(self):
+        """Stage 1 weights of all node ids. They do not depend on the weight
+        threshold, so they are computed once and reused by later runs"""
+        if self._weights is None:
+            self._weights = vertex_weights(self.graph, self.n_jobs, self.weighted)
+        return self._weights
+
+    def _component_alg(self, graph):
+        alg = super(MCODE, self)._component_alg(graph)
+        alg._weights = None
+        alg.n_jobs = 1
+        return alg
+
+    def cluster(self, verbose=False):
+        self.clusters = list(self.iter_clusters(verbose))
+
+    def iter_clusters(self, verbose=False):
+        graph = self.graph
+        instrument = self.instrument
+        instrument.reset()
+        edges = graph.neighbor_sets()  # node id => neighboring node ids
+        if verbose:
+            print ('## Input graph loaded; %i nodes' % (len(edges),))
 
         # Stage 1: Vertex Weighting
-        print ('## Weighting vertices...')
-        weights = dict((v, 1.) for v in edges)
-        for i, v in enumerate(edges):
-            neighborhood = set((v,)) | edges[v]
-            # if node has only one neighbor, we know everything we need to know
-            if len(neighborhood) <= 2:
-                continue
-
-            # see if larger k-cores exist
-            k = 1  # highest valid k-core
-            while neighborhood:
-                k_core = neighborhood.copy()
-                invalid_nodes = True
-                while invalid_nodes and neighborhood:
-                    invalid_nodes = set(n for n in neighborhood if len(
-                        edges[n] & neighborhood) <= k)
-                    neighborhood -= invalid_nodes
-                k += 1  # on exit, k will be one greater than we want
-
-            # vertex weight = k-core number * density of k-core
-            weights[v] = (k - 1) * (sum(len(edges[n] & k_core)
-                                        for n in k_core) / (2. * len(k_core)**2))
+        if verbose:
+            print ('## Weighting vertices...')
+        with instrument.stage("weighting"):
+            weights = self.vertex_weights()
 
         # Stage 2: Molecular Complex Prediction
-        print('## Molecular complex prediction...')
-        unvisited = set(edges)
+        if verbose:
+            print('## Molecular complex prediction...')
         num_clusters = 0
-
-        for seed in sorted(weights, key=weights.get, reverse=True):
-            if seed not in unvisited:
-                continue
-
-            cluster, frontier = set((seed,)), set((seed,))
-            w = weights[seed] * self.weight_threshold
-            while frontier:
-                cluster.update(frontier)
-                unvisited -= frontier
-                frontier = set(n for n in set.union(
-                    *(edges[n] for n in frontier)) & unvisited if weights[n] > w)
-
-            # Haircut: only keep 2-core complexes
-            invalid_nodes = True
-            while invalid_nodes and cluster:
-                invalid_nodes = set(
-                    n for n in cluster if len(edges[n] & cluster) < 2)
-                cluster -= invalid_nodes
-
-            if cluster:
-                # fluff never really seems to improve anything...
-                # cluster.update(
-                # n for n in set.union(*(edges[c] for c in cluster)) & unvisited
-                # if densities[n] > FLUFF_THRESHOLD)
-
+        complexes = predict_complexes(edges, weights, self.weight_threshold, instrument)
+        while True:
+            with instrument.stage("prediction"):
+                found = next(complexes, None)
+            if found is None:
+                break
+            seed, cluster = found
+            cluster = graph.to_names(cluster)
+            num_clusters += 1
+            instrument.count("clusters")
+            if verbose:
                 print (' '.join(cluster))
-                num_clusters += 1
-                print (num_clusters, len(cluster), seed)
-                clusters.append(cluster)
-
-        self.clusters = clusters
+                print (num_clusters, len(cluster), graph.names[seed])
+            yield cluster
+
+    def update(self, added=(), removed=()):
+        """Applies a delta of interactions added and removed (see
+        ``Graph.apply_delta``) and re-clusters the network. The Stage 1 weight of
+        a vertex only depends on the interactions within its neighborhood, so only
+        the endpoints of changed interactions and their common neighbors, before
+        and after the change, are weighted again; Stage 2 is rerun on all weights.
+        The clusters are those of a full run on the updated graph"""
+        added, removed = list(added), list(removed) # read twice, may be iterators
+        old = self.graph
+        weights = list(self.vertex_weights())
+        graph = old.apply_delta(added, removed)
+        old_edges, edges = old.neighbor_sets(), graph.neighbor_sets()
+        index = graph.index
+
+        changed = set()
+        for edge in added + removed:
+            a, b = index.get(edge[0]), index.get(edge[1])
+            if a is None or b is None:
+                continue
+            changed.update((a, b))
+            # vertices whose neighborhood holds both endpoints (all neighbors of a loop)
+            for data in (edges, old_edges):
+                if a < len(data) and b < len(data):
+                    changed |= data[a] if a == b else data[a] & data[b]
+
+        weights.extend([None] * (len(graph) - len(weights)))
+        weighted_graph = graph if self.weighted else None
+        for v in changed:
+            weights[v] = vertex_weight(edges, v, weighted_graph)
+
+        self._graph, self._weights = graph, weights
+        self.cluster()
+        self.instrument.count("reweighted_vertices", len(changed))
+
+    def sweep(self, weight_thresholds):
+        """Runs Stage 2 and the haircut for every vertex weight percentage in
+        ``weight_thresholds``, weighting the vertices only once. Thresholds are run
+        in ``n_jobs`` worker processes. Returns a dict of threshold => clusters, the
+        clusters being those ``cluster()`` finds with that threshold"""
+        graph = self.graph
+        weights = self.vertex_weights()
+        thresholds = list(weight_thresholds)
+        n_jobs = min(resolve_jobs(self.n_jobs), len(thresholds))
+        if n_jobs <= 1:
+            edges = graph.neighbor_sets()
+            results = [[graph.to_names(cluster) for _, cluster in
+                        predict_complexes(edges, weights, 1 - t)] for t in thresholds]
+        else:
+            with worker_pool(n_jobs, _sweep_state, (graph, weights)) as pool:
+                results = pool.map(_sweep_threshold, thresholds, chunksize=1)
+        return dict(zip(thresholds, results))
 
 # if __name__ == '__main__':
 #     filename = "../data/unweighted_example_network.txt"
@@ -0,0 +1,41 @@
+# Worker process pools shared by the algorithms and the command line
+# Resolves n_jobs options and sets up read-only state once in every worker
+
+# Author: Paul Scherer
+# MIT LICENSE
+
+import os
+from multiprocessing import Pool
+
+# state built by the pool's setup function, once in every worker process
+worker_state = {}
+
+
+def resolve_jobs(n_jobs):
+    """Number of worker processes for an ``n_jobs`` option, all cpus for None or
+    a negative value (e.g. -1)"""
+    if n_jobs is None or n_jobs < 0:
+        return os.cpu_count() or 1
+    return n_jobs
+
+
+def chunk_size(n_items, n_jobs):
+    """Number of items per task when ``n_items`` are split over ``n_jobs``
+    workers. Every worker gets several chunks so that runs of expensive items,
+    such as hub proteins, get spread out"""
+    return max(1, -(-n_items // (n_jobs * 8)))
+
+
+def _init_worker(setup, args):
+    worker_state.clear()
+    worker_state.update(setup(*args))
+
+
+def worker_pool(n_jobs, setup=None, args=(), **kwargs):
+    """Pool of ``n_jobs`` worker processes. Every worker runs ``setup(*args)``
+    once, if given, and tasks find the dict it returns as ``worker_state``, so
+    that large read-only inputs are sent and built once per worker rather than
+    per task. Other keyword arguments are passed on to ``Pool``"""
+    if setup is not None:
+        kwargs.update(initializer=_init_worker, initargs=(setup, args))
+    return Pool(n_jobs, **kwargs)
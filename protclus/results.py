@@ -0,0 +1,129 @@
+# Compact storage of clustering results
+# Clusters are held as integer node ids over a shared node table, in CSR form,
+# instead of as Python sets of protein names
+
+# Author: Paul Scherer
+# MIT LICENSE
+
+import numpy as np
+
+RESULTS_VERSION = 1
+
+
+class ClusterSet(object):
+    """Clusters stored as arrays of node ids into the node table ``names``. The
+    members of cluster ``i`` are ``members[offsets[i]:offsets[i+1]]``, in
+    ascending id order and without repeats. Clusters may overlap, and the
+    clusters of every node are looked up with ``clusters_of``.
+
+    Indexing and iterating gives the clusters as lists of names, so a
+    ``ClusterSet`` can stand in for a list of clusters, e.g. for evaluation.
+
+    """
+
+    def __init__(self, names, offsets, members):
+        self.names = names
+        self.offsets = offsets
+        self.members = members
+        self._index = None
+        self._node_offsets = None
+        self._node_clusters = None
+
+    @classmethod
+    def from_clusters(cls, clusters, names=None, index=None):
+        """Builds the set from an iterable of clusters of protein names, consumed
+        one cluster at a time. ``names`` is the node table to share, e.g. that of
+        the clustered graph, with ``index`` mapping names to ids if already at
+        hand. Without ``names`` the table holds the clustered proteins in order of
+        first appearance"""
+        if names is None:
+            names, index = [], {}
+
+            def lookup(p):
+                v = index.get(p)
+                if v is None:
+                    v = index[p] = len(names)
+                    names.append(p)
+                return v
+        else:
+            index = index if index is not None else dict((n, i) for i, n in enumerate(names))
+            lookup = index.__getitem__
+        sizes, chunks = [], []
+        for cluster in clusters:
+            ids = np.unique(np.fromiter(map(lookup, cluster), dtype=np.int32))
+            sizes.append(len(ids))
+            chunks.append(ids)
+        offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+        np.cumsum(sizes, out=offsets[1:])
+        members = np.concatenate(chunks) if chunks else np.zeros(0, dtype=np.int32)
+        result = cls(names, offsets, members)
+        result._index = index
+        return result
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __str__(self):
+        return (f"ClusterSet with {len(self)} clusters of {len(self.names)} nodes")
+
+    def __getitem__(self, i):
+        return [self.names[v] for v in self.ids(i).tolist()]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    @property
+    def index(self):
+        """Mapping from protein name to node id"""
+        if self._index is None:
+            self._index = dict((name, i) for i, name in enumerate(self.names))
+        return self._index
+
+    def ids(self, i):
+        """Array with the node ids of cluster ``i``"""
+        if not -len(self) <= i < len(self):
+            raise IndexError("cluster index out of range")
+        i %= len(self)
+        return self.members[self.offsets[i]:self.offsets[i + 1]]
+
+    def sizes(self):
+        """Array with the size of every cluster"""
+        return np.diff(self.offsets)
+
+    def clusters_of(self, name):
+        """Array with the indices of the clusters ``name`` belongs to, ascending.
+        The node to clusters lookup is built once, on first use"""
+        if self._node_offsets is None:
+            order = np.argsort(self.members, kind='stable')
+            self._node_clusters = np.repeat(np.arange(len(self), dtype=np.int64),
+                                            self.sizes())[order]
+            self._node_offsets = np.zeros(len(self.names) + 1, dtype=np.int64)
+            np.cumsum(np.bincount(self.members, minlength=len(self.names)),
+                      out=self._node_offsets[1:])
+        v = self.index.get(name)
+        if v is None:
+            return self._node_clusters[:0]
+        return self._node_clusters[self._node_offsets[v]:self._node_offsets[v + 1]]
+
+    def save(self, path):
+        """Saves the clusters in binary form (NumPy ``.npz``) that ``load`` reads
+        back"""
+        with open(path, 'wb') as fh:
+            np.savez(fh, version=RESULTS_VERSION, names=np.array(self.names, dtype=str),
+                     offsets=self.offsets, members=self.members)
+
+    @classmethod
+    def load(cls, path):
+        """Loads clusters written by ``save``"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"]) != RESULTS_VERSION:
+                raise ValueError(f"{path} holds clusters of an unsupported version")
+            return cls(data["names"].tolist(), data["offsets"], data["members"])
+
+    def save_text(self, path):
+        """Saves clusters as text, one cluster of space separated names per line,
+        as ``ClusterAlg.save_clusters`` does"""
+        with open(path, 'w') as fh:
+            for c in self:
+                fh.write(' '.join(c) + "\n")
@@ -17,6 +17,7 @@ setup(name="protclus",
     test_suite="nose.collector",
     tests_require=["pytest", "pytest-cov", "mock"],
     packages=find_packages(),
+    entry_points={'console_scripts': ['protclus=protclus.cli:main']},
     include_package_data=True,
     classifiers=['Topic :: Scientific/Engineering :: Artificial Intelligence',
                  'License :: OSI Approved :: MIT License',
@@ -0,0 +1,30 @@
+from protclus.benchmark import synthetic_ppi, run_benchmark, write_report, read_report, compare_reports
+
+
+def test_synthetic_ppi():
+    """
+    ## Testing synthetic PPI networks are reproducible and of the requested size
+    """
+    g, complexes = synthetic_ppi(2000, seed=1)
+    h, _ = synthetic_ppi(2000, seed=1)
+    assert g.n_edges == 2000
+    assert g.names == h.names
+    assert (g.edges == h.edges).all()
+    assert all(3 <= len(c) <= 20 for c in complexes)
+    assert g.degree().max() > 5 * g.degree().mean()
+
+def test_benchmark_report(tmp_path):
+    """
+    ## Testing benchmark records round trip and baseline comparison
+    """
+    records = run_benchmark(sizes=[500], algorithms=["MCODE", "DPCLUS"])
+    assert [(r["algorithm"], r["stage"]) for r in records] == [
+        ("MCODE", "load"), ("MCODE", "weighting"), ("MCODE", "prediction"),
+        ("DPCLUS", "load"), ("DPCLUS", "support"), ("DPCLUS", "growth"), ("DPCLUS", "removal")]
+    assert all(r["peak_mb"] > 0 for r in records)
+    for path in (str(tmp_path / "report.json"), str(tmp_path / "report.csv")):
+        write_report(records, path)
+        assert read_report(path) == records
+    assert compare_reports(records, records) == []
+    slower = [dict(r, seconds=r["seconds"] * 2 + 1) for r in records]
+    assert len(compare_reports(slower, records)) == len(records)
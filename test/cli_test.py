@@ -0,0 +1,49 @@
+import csv
+import pytest
+from protclus.cli import main, parse_params, parse_columns, expand_networks, run_batch
+
+weighted_filename = "data/weighted_example_network.txt"
+
+
+def test_parse_params():
+    """
+    ## Testing algorithm parameters given on the command line
+    """
+    params = parse_params(["MCODE.weight_threshold=0.3", "coach.order=read"])
+    assert params["MCODE"] == {"weight_threshold": 0.3}
+    assert params["COACH"] == {"order": "read"}
+    assert params["DPCLUS"] == {}
+    assert parse_columns(["protein1", "1", "combined_score"]) == ["protein1", 1, "combined_score"]
+    assert expand_networks(["data/*.txt", weighted_filename]) == [
+        "data/unweighted_example_network.txt", weighted_filename]
+
+def test_cli_batch(tmp_path):
+    """
+    ## Testing the protclus command runs jobs and writes clusters and a summary
+    """
+    out = tmp_path / "out"
+    status = main([weighted_filename, "-a", "mcode", "dpclus", "-j", "2", "--weighted",
+                   "--min-weight", "0.6", "-p", "MCODE.weight_threshold=0.3", "-o", str(out)])
+    assert status == 0
+    with open(str(out / "summary.csv")) as fh:
+        records = list(csv.DictReader(fh))
+    assert [r["algorithm"] for r in records] == ["MCODE", "DPCLUS"]
+    for r in records:
+        with open(r["output"]) as fh:
+            assert len(fh.readlines()) == int(r["clusters"]) > 0
+        assert r["error"] == ""
+    with pytest.raises(ValueError):
+        run_batch([weighted_filename], ["MCODE"], output_dir=str(out), cache=True, columns=[0, 1])
+
+def test_cli_table_header(tmp_path):
+    """
+    ## Testing tables with a header line are read with --header
+    """
+    table = tmp_path / "table.txt"
+    table.write_text("protein1 protein2 combined_score\na b 900\nb c 800\nc a 100\n")
+    out = tmp_path / "out"
+    assert main([str(table), "-a", "dpclus", "--columns", "0", "1", "2", "--min-weight", "500",
+                 "-o", str(out)]) == 1
+    assert main([str(table), "-a", "dpclus", "--columns", "0", "1", "2", "--header",
+                 "--min-weight", "500", "-o", str(out)]) == 0
+    assert set((out / "table.dpclus.txt").read_text().split()) <= {"a", "b", "c"}
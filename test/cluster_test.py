@@ -32,8 +32,19 @@ def test_ipca_cluster():
     c = IPCA(unweighted_filename)
     assert len(c.clusters)==0
     c.cluster()
+    assert len(c.clusters) == 2724
+    assert len(c.clusters[-1]) == 8
+    assert c.clusters[0][:4] == ("YDL029W", "YNL271C", "YOR326W", "YHR030C")
+
+def test_ipca_cluster_py27():
+    """
+    ## Testing IPCA reproduces the original script with Python 2.7 ordering
+    """
+    c = IPCA(unweighted_filename, order="py27")
+    c.cluster()
     assert len(c.clusters) == 2806
     assert len(c.clusters[-1]) == 23
+    assert list(c.clusters[0])[:4] == ["YAL012W", "YMR198W", "YDR369C", "YCR066W"]
 
 def test_coach_cluster():
     """
@@ -42,4 +53,209 @@ def test_coach_cluster():
     c = COACH(unweighted_filename)
     assert len(c.clusters)==0
     c.cluster()
-    assert len(c.clusters) >= 1800
\ No newline at end of file
+    assert len(c.clusters) >= 1800
+
+def test_coach_read_order():
+    """
+    ## Testing COACH read order mode is deterministic
+    """
+    from protclus import Graph
+    g = Graph.from_edgelist(unweighted_filename)
+    first, second = COACH(g), COACH(g)
+    first.cluster()
+    second.cluster()
+    assert first.clusters == second.clusters
+    assert len(first.clusters) == 1800
+
+def test_dpclus_edge_support():
+    """
+    ## Testing DPCLUS edge support counts are maintained as nodes are removed
+    """
+    from protclus import Graph
+    from protclus.dpclus import EdgeSupport
+    g = Graph.from_arrays(list("abcde"), [0, 0, 0, 1, 1, 2, 3], [1, 2, 3, 2, 3, 3, 4])
+    support = EdgeSupport(g)
+    assert support.edges[0][1] == 2
+    assert support.weights[0] == 6
+    support.remove([2, 2])
+    assert support.unvisited == {0, 1, 3, 4}
+    assert support.edges[0] == {1: 1, 3: 1}
+    assert support.weights[0] == 2 and support.weights[4] == 0
+    assert support.degrees[3] == 3
+
+def test_mcode_parallel_weights():
+    """
+    ## Testing parallel MCODE vertex weighting matches the serial weights
+    """
+    from protclus import Graph
+    from protclus.mcode import vertex_weights
+    edges = np.loadtxt(unweighted_filename, dtype=str, max_rows=5000)
+    names, ids = np.unique(edges, return_inverse=True)
+    ids = ids.reshape(edges.shape)
+    g = Graph.from_arrays(list(names), ids[:, 0], ids[:, 1])
+    assert vertex_weights(g, n_jobs=3) == vertex_weights(g)
+
+def test_weighted_cluster():
+    """
+    ## Testing MCODE and DPCLUS on weighted network
+    """
+    weighted_filename = "data/weighted_example_network.txt"
+    c = MCODE(weighted_filename, weighted=True)
+    c.cluster()
+    assert len(c.clusters) == 70
+    c = DPCLUS(weighted_filename, weighted=True)
+    c.cluster()
+    assert len(c.clusters) == 1516
+    c = DPCLUS(weighted_filename, min_weight=0.3)
+    c.cluster()
+    assert len(c.clusters) == 790
+
+    # fine-tuning picks nodes other than the highest priority one
+    from protclus import Graph
+    from protclus.benchmark import synthetic_ppi
+    g, _ = synthetic_ppi(600, seed=5)
+    weights = np.random.RandomState(0).uniform(0.5, 1.5, len(g.edges))
+    g = Graph.from_arrays(g.names, g.edges[:, 0], g.edges[:, 1], weights=weights)
+    c = DPCLUS(g, weighted=True, d_threshold=0.5)
+    c.cluster()
+    assert c.metrics["counters"]["fine_tuning"] > 0
+    assert len(c.clusters) == 24
+    assert sum(map(len, c.clusters)) == 219
+
+def test_stream_clusters(tmp_path):
+    """
+    ## Testing clusters can be streamed to a file, or consumed lazily
+    """
+    c = DPCLUS(unweighted_filename)
+    first = next(c.iter_clusters())
+    assert len(c.clusters) == 0
+    n = c.stream_clusters(str(tmp_path / "streamed.txt"))
+    assert n == 901
+    assert len(c.clusters) == 0
+    c.cluster()
+    assert c.clusters[0] == first
+    c.save_clusters(str(tmp_path / "saved.txt"))
+    assert (tmp_path / "streamed.txt").read_text() == (tmp_path / "saved.txt").read_text()
+
+def test_mcode_sweep():
+    """
+    ## Testing an MCODE threshold sweep matches separate runs
+    """
+    c = MCODE(unweighted_filename, n_jobs=2)
+    results = c.sweep([0.1, 0.2, 0.3])
+    assert sorted(results) == [0.1, 0.2, 0.3]
+    assert results[0.2] == MCODE(c.graph).sweep([0.2])[0.2]
+    single = MCODE(c.graph, weight_threshold=0.3)
+    single.cluster()
+    assert results[0.3] == single.clusters
+    assert len(results[0.2]) == 59
+
+def test_coach_sweep(tmp_path):
+    """
+    ## Testing COACH sweeps and saved cores match separate runs
+    """
+    from protclus.benchmark import synthetic_ppi
+    g, _ = synthetic_ppi(3000, seed=1)
+    for order in ("read", "py27"):
+        c = COACH(g, order=order)
+        results = c.sweep([0.4, 0.5], [0.225, 0.3])
+        assert sorted(results) == [(0.225, 0.4), (0.225, 0.5), (0.3, 0.4), (0.3, 0.5)]
+        single = COACH(g, order=order, affinity_threshold=0.3, closeness_threshold=0.4)
+        assert results[0.3, 0.4] == single.cluster()
+        c.save_cores(str(tmp_path / "cores.pkl"))
+        loaded = COACH(g, order=order)
+        loaded.load_cores(str(tmp_path / "cores.pkl"))
+        assert loaded.cluster() == results[0.225, 0.5]
+
+def test_coach_parallel():
+    """
+    ## Testing parallel COACH core finding gives the serial result
+    """
+    from protclus.benchmark import synthetic_ppi
+    g, _ = synthetic_ppi(3000, seed=1)
+    for order in ("read", "py27"):
+        serial = COACH(g, order=order).cluster()
+        assert COACH(g, order=order, n_jobs=3).cluster() == serial
+
+def test_cluster_components():
+    """
+    ## Testing clustering by connected component finds the same clusters
+    """
+    from protclus import Graph
+    g = Graph.from_edgelist("data/weighted_example_network.txt", weighted=True, min_weight=0.6)
+    canonical = lambda clusters: sorted(tuple(sorted(c)) for c in clusters)
+    for alg in (MCODE(g, weighted=True), DPCLUS(g), IPCA(g)):
+        alg.cluster()
+        whole = canonical(alg.clusters)
+        alg.cluster_components()
+        serial = alg.clusters
+        assert canonical(serial) == whole
+        alg.cluster_components(n_jobs=2, batch_edges=500)
+        assert alg.clusters == serial
+
+def test_instrumentation(capsys):
+    """
+    ## Testing runs are silent and collect stage timings and counters
+    """
+    from protclus import Graph, Instrument
+    g = Graph.from_edgelist("data/weighted_example_network.txt", min_weight=0.6)
+    progress = []
+    c = MCODE(g, instrument=Instrument(lambda stage, done, total: progress.append((stage, done, total))))
+    c.cluster()
+    assert capsys.readouterr().out == ""
+    assert set(c.metrics["timings"]) == {"weighting", "prediction"}
+    assert c.metrics["counters"]["clusters"] == len(c.clusters)
+    assert progress[-1] == ("prediction", g.n_nodes, g.n_nodes)
+    for alg in (DPCLUS(g), IPCA(g), COACH(g)):
+        alg.cluster()
+        assert capsys.readouterr().out == ""
+        assert alg.metrics["counters"]["clusters"] == len(alg.clusters)
+    c.cluster_components()
+    assert c.metrics["counters"]["components"] == g.components().max() + 1
+
+def test_mcode_update():
+    """
+    ## Testing MCODE re-clustering after an edge delta matches a full run
+    """
+    from protclus import Graph
+    g = Graph.from_edgelist(unweighted_filename)
+    c = MCODE(g)
+    c.cluster()
+    removed = [(g.names[a], g.names[b]) for a, b in g.edges[::500].tolist()]
+    added = [(g.names[i], g.names[i + 7]) for i in range(0, 2000, 40)] + [("new", g.names[0])]
+    c.update(iter(added), (edge for edge in removed))
+    full = MCODE(g.apply_delta(added, removed))
+    full.cluster()
+    assert c.clusters == full.clusters
+    assert 0 < c.metrics["counters"]["reweighted_vertices"] < len(g)
+
+def test_coach_dense_cores():
+    """
+    ## Testing bitset core finding gives the cores of the set based version
+    """
+    from protclus import Graph
+    from protclus.coach import adjacency, core_density, dense_vertex_cores, set_vertex_cores, ReadOrder
+    g = Graph.from_edgelist(unweighted_filename)
+    data = adjacency(g, "read")
+    for threshold in (0.5, 0.7):
+        for vertex in list(data)[::20]:
+            dense = dense_vertex_cores(data, vertex, threshold)
+            cores = set_vertex_cores(data, vertex, threshold, ReadOrder)
+            assert [(set(sg), d) for sg, _, d in dense] == [(set(sg_nodes), d) for _, sg_nodes, d in cores]
+            assert [core_density(sg) for sg, _, _ in dense] == [core_density(sg) for sg, _, _ in cores]
+
+def test_isolated_nodes():
+    """
+    ## Testing all algorithms run on graphs with nodes without interactions
+    """
+    from protclus import Graph
+    G = nx.relabel_nodes(nx.karate_club_graph(), str)
+    G.add_node("isolated")
+    for alg in (MCODE(G), DPCLUS(G), IPCA(G), COACH(G)):
+        alg.cluster()
+        assert alg.clusters and not any("isolated" in c for c in alg.clusters)
+    g = Graph.from_arrays(list("abcdef"), [0, 1, 2, 3, 4], [1, 2, 0, 4, 5],
+                          weights=[1., 1., 1., 1., 0.1], min_weight=0.5)
+    for alg in (DPCLUS(g), IPCA(g)):
+        alg.cluster()
+        assert sorted(sorted(c) for c in alg.clusters) == [["a", "b", "c"], ["d", "e"]]
@@ -0,0 +1,51 @@
+import math
+import random
+
+from protclus import MCODE
+from protclus.evaluation import evaluate, read_complexes
+
+filename = "data/unweighted_example_network.txt"
+
+
+def reference_metrics(predicted, reference, threshold=0.2):
+    """Pairwise pure Python computation of the metrics"""
+    predicted, reference = [set(c) for c in predicted], [set(c) for c in reference]
+    shared = [[len(p & r) for r in reference] for p in predicted]
+    matches = [[shared[i][j] ** 2 / (len(p) * len(r)) >= threshold for j, r in enumerate(reference)]
+               for i, p in enumerate(predicted)]
+    precision = sum(any(row) for row in matches) / len(predicted)
+    recall = sum(any(col) for col in zip(*matches)) / len(reference)
+    sn = sum(max(col) for col in zip(*shared)) / sum(len(r) for r in reference)
+    ppv = sum(max(row) for row in shared) / sum(map(sum, shared))
+    return precision, recall, sn, ppv
+
+
+def test_evaluate():
+    """
+    ## Testing evaluation metrics against a pairwise computation
+    """
+    rng = random.Random(0)
+    proteins = ["P%d" % i for i in range(60)]
+    predicted = [rng.sample(proteins, rng.randint(2, 12)) for _ in range(40)]
+    reference = [rng.sample(proteins, rng.randint(2, 12)) for _ in range(30)]
+    scores = evaluate(predicted, reference)
+    precision, recall, sn, ppv = reference_metrics(predicted, reference)
+    assert (scores["n_predicted"], scores["n_reference"]) == (40, 30)
+    assert math.isclose(scores["precision"], precision)
+    assert math.isclose(scores["recall"], recall)
+    assert math.isclose(scores["f1"], 2 * precision * recall / (precision + recall))
+    assert math.isclose(scores["sensitivity"], sn)
+    assert math.isclose(scores["ppv"], ppv)
+    assert math.isclose(scores["accuracy"], math.sqrt(sn * ppv))
+
+def test_evaluate_clusters(tmp_path):
+    """
+    ## Testing evaluation of a clustering run against its own clusters
+    """
+    c = MCODE(filename)
+    c.cluster()
+    path = str(tmp_path / "clusters.txt")
+    c.save_clusters(path)
+    scores = evaluate(c, read_complexes(path))
+    assert scores["precision"] == scores["recall"] == scores["sensitivity"] == 1.
+    assert evaluate([], read_complexes(path))["recall"] == 0.
@@ -0,0 +1,206 @@
+import numpy as np
+import pytest
+from protclus import Graph, MCODE
+
+unweighted_filename = "data/unweighted_example_network.txt"
+
+
+def test_graph_from_edgelist():
+    """
+    ## Testing integer indexed CSR graph loading
+    """
+    g = Graph.from_edgelist(unweighted_filename)
+    assert g.n_nodes == 4416
+    assert g.n_edges == 83151
+    assert g.names[:2] == ["YFL039C", "YBR243C"]
+    assert g.index["YBR243C"] == 1
+    assert len(g.indptr) == g.n_nodes + 1
+    assert g.indptr[-1] == len(g.indices) == 2 * g.n_edges
+    assert list(g.neighbors(0)[:2]) == [1, 2]
+
+def test_graph_duplicate_edges():
+    """
+    ## Testing repeated interactions are stored once
+    """
+    g = Graph.from_arrays(["a", "b", "c"], [0, 1, 0, 2], [1, 0, 2, 2])
+    assert g.n_edges == 3
+    assert g.neighbor_sets() == [{1, 2}, {0}, {0, 2}]
+    assert np.array_equal(g.degree(), [2, 1, 2])
+    assert g.to_names([0, 2]) == {"a", "c"}
+
+def test_shared_graph():
+    """
+    ## Testing algorithms accept an already loaded graph
+    """
+    g = Graph.from_edgelist(unweighted_filename)
+    c = MCODE(g)
+    assert c.graph is g
+    assert c.filename == unweighted_filename
+
+def test_edge_support():
+    """
+    ## Testing edge support (common neighbor) counts
+    """
+    g = Graph.from_arrays(list("abcde"), [0, 0, 0, 1, 1, 2, 3, 4], [1, 2, 3, 2, 3, 3, 4, 4])
+    data = g.neighbor_sets()
+    rows = np.repeat(np.arange(g.n_nodes), g.degree())
+    expected = [len(data[a] & data[b]) if a != b else 0
+                for a, b in zip(rows.tolist(), g.indices.tolist())]
+    assert g.edge_support().tolist() == expected
+    assert g.edge_support() is g.edge_support()
+    assert g.node_support().tolist() == [6, 6, 6, 7, 1]
+
+def test_core_numbers():
+    """
+    ## Testing bucket core decomposition of a graph and an induced subgraph
+    """
+    import networkx as nx
+    G = nx.gnm_random_graph(200, 1200, seed=0)
+    sources, targets = zip(*G.edges())
+    g = Graph.from_arrays(list(range(200)), sources, targets)
+    assert g.core_numbers() == nx.core_number(G)
+    nodes = range(0, 200, 3)
+    assert g.core_numbers(nodes) == nx.core_number(G.subgraph(nodes))
+
+def test_graph_cache(tmp_path):
+    """
+    ## Testing the binary graph cache is reused and invalidated
+    """
+    import os, pickle, shutil
+    filename = str(tmp_path / "network.txt")
+    shutil.copy(unweighted_filename, filename)
+    g = Graph.from_edgelist(filename, cache=True)
+    assert os.path.isdir(filename + ".protclus-cache")
+    h = Graph.from_edgelist(filename, cache=True)
+    assert isinstance(h.indices, np.memmap)
+    assert h.names == g.names and h.filename == filename
+    assert np.array_equal(h.indptr, g.indptr) and np.array_equal(h.indices, g.indices)
+    assert isinstance(pickle.loads(pickle.dumps(h)).indices, np.memmap)
+
+    # touching the file keeps the cache, changing its content rebuilds it
+    os.utime(filename, ns=(0, 0))
+    assert isinstance(Graph.from_edgelist(filename, cache=True).indices, np.memmap)
+    with open(filename, 'a') as f:
+        f.write("NEW1 NEW2\n")
+    h = Graph.from_edgelist(filename, cache=True)
+    assert not isinstance(h.indices, np.memmap)
+    assert h.names[-2:] == ["NEW1", "NEW2"]
+
+    cache_dir = str(tmp_path / "cache")
+    Graph.from_edgelist(filename, cache=cache_dir)
+    assert len(os.listdir(cache_dir)) == 1
+    assert Graph.from_edgelist(filename, cache=cache_dir).n_edges == g.n_edges + 1
+
+def test_weighted_graph():
+    """
+    ## Testing interaction weights are aligned with the adjacency
+    """
+    g = Graph.from_arrays(list("abc"), [0, 1, 0, 2], [1, 2, 1, 2], weights=[0.5, 0.25, 1., 0.75])
+    assert g.weighted
+    assert g.weights.tolist() == [0.5, 0.5, 0.25, 0.25, 0.75]
+    assert g.induced_weight([0, 1, 2]) == 2.25
+    assert g.induced_weight([1, 2]) == 1.25
+    h = Graph.from_arrays(list("abc"), [0, 1, 2], [1, 2, 2], weights=[0.5, 0.25, 0.75], min_weight=0.5)
+    assert h.n_edges == 2 and h.neighbor_sets() == [{1}, {0}, {2}]
+
+    weighted_filename = "data/weighted_example_network.txt"
+    g = Graph.from_edgelist(weighted_filename, weighted=True)
+    assert g.n_edges == 83151
+    assert abs(g.weights[0] - 0.021648637) < 1e-12
+    assert not Graph.from_edgelist(weighted_filename).weighted
+    h = Graph.from_edgelist(weighted_filename, min_weight=0.5)
+    assert h.n_edges == int((g.weights >= 0.5).sum()) // 2
+
+def test_split_components():
+    """
+    ## Testing connected components are split into graphs of their own
+    """
+    g = Graph.from_arrays(["a", "b", "c", "d", "e", "f"], [3, 0, 4, 1, 5], [4, 1, 3, 2, 5],
+                          weights=[0.1, 0.2, 0.3, 0.4, 0.5])
+    assert list(g.components()) == [0, 0, 0, 1, 1, 2]
+    parts = g.split_components()
+    assert [p.names for p in parts] == [["a", "b", "c"], ["d", "e"], ["f"]]
+    assert parts[0].neighbor_sets() == [{1}, {0, 2}, {1}]
+    assert parts[0].edges.tolist() == [[0, 1], [1, 2]]
+    assert list(parts[0].weights) == [0.2, 0.2, 0.4, 0.4]
+    assert parts[1].edges.tolist() == [[0, 1], [1, 0]]
+    assert parts[2].neighbor_sets() == [{0}]
+    assert sum(p.n_edges for p in parts) == g.n_edges
+
+def test_apply_delta():
+    """
+    ## Testing interactions are added to and removed from a graph
+    """
+    g = Graph.from_arrays(["a", "b", "c"], [0, 1, 2], [1, 2, 0], weights=[0.1, 0.2, 0.3])
+    assert list(g.edge_weights()) == [0.1, 0.2, 0.3]
+    h = g.apply_delta(added=[("c", "d", 0.4)], removed=[("b", "a"), ("a", "x")])
+    assert h.names == ["a", "b", "c", "d"]
+    assert h.index["d"] == 3
+    assert h.neighbor_sets() == [{2}, {2}, {0, 1, 3}, {2}]
+    assert list(h.edge_weights()) == [0.2, 0.3, 0.4]
+    assert g.n_edges == 3
+
+def test_in_memory_inputs():
+    """
+    ## Testing graphs built from edge arrays, sparse matrices and NetworkX graphs
+    """
+    import networkx as nx
+    rows = [line.split() for line in open("data/weighted_example_network.txt")]
+    g = Graph.from_edgelist("data/weighted_example_network.txt", weighted=True, min_weight=0.5)
+    h = Graph.from_data(np.array(rows), weighted=True, min_weight=0.5)
+    assert h.names == g.names
+    assert np.array_equal(h.indices, g.indices) and np.array_equal(h.weights, g.weights)
+    assert MCODE(np.array(rows)[:, :2]).graph.names == Graph.from_edgelist(unweighted_filename).names
+    with pytest.raises(ValueError):
+        MCODE(g, min_weight=0.5)
+
+    edges = np.array([[0, 1], [1, 2], [2, 0]], dtype=np.int32)
+    h = Graph.from_edge_array(edges, names=["a", "b", "c"])
+    assert h.edges is edges and h.n_edges == 3
+
+    G = nx.Graph()
+    G.add_edge("a", "b", weight=0.3)
+    G.add_edge("b", "c")
+    G.add_node("d")
+    h = Graph.from_data(G, weighted=True)
+    assert h.names == ["a", "b", "c", "d"]
+    assert h.neighbor_sets() == [{1}, {0, 2}, {1}, set()]
+    assert h.weights.tolist() == [0.3, 0.3, 1., 1.]
+
+    class Coo(object): # stands in for a scipy.sparse matrix
+        shape = (4, 4)
+        row, col, data = np.array([0, 1, 1, 2, 3]), np.array([1, 0, 2, 1, 3]), np.array([2., 2., 1., 1., 0.])
+        def tocoo(self):
+            return self
+    h = Graph.from_sparse(Coo(), weighted=True)
+    assert h.names == ["0", "1", "2", "3"]
+    assert h.edges.tolist() == [[0, 1], [1, 2]]
+    assert h.neighbor_sets() == [{1}, {0, 2}, {1}, set()]
+    assert Graph.from_sparse(Coo(), min_weight=1.5).n_edges == 1
+
+def test_table_reader(tmp_path):
+    """
+    ## Testing compressed multi-column tables are streamed into the same graph
+    """
+    import gzip
+    filename = "data/weighted_example_network.txt"
+    g = Graph.from_edgelist(filename, weighted=True, min_weight=0.5)
+    table = str(tmp_path / "network.tsv.gz")
+    with open(filename) as src, gzip.open(table, 'wt') as dst:
+        dst.write("#score\tprotein_a\tprotein_b\n# exported interactions\n")
+        for line in src:
+            a, b, w = line.split()
+            dst.write("%s\t%s\t%s\n" % (w, a, b))
+    h = Graph.from_table(table, "protein_a", "protein_b", "score", min_weight=0.5,
+                         delimiter="\t")
+    assert h.names == g.names
+    assert np.array_equal(h.indices, g.indices) and np.array_equal(h.weights, g.weights)
+
+    # rows of uneven width, and rows missing a selected column
+    table = str(tmp_path / "ragged.txt")
+    with open(table, 'w') as fh:
+        fh.write("a b 1 extra\n\nb c 2\nc a\n")
+    h = Graph.from_table(table)
+    assert h.names == ["a", "b", "c"] and h.edges.tolist() == [[0, 1], [1, 2], [2, 0]]
+    with pytest.raises(ValueError, match="Line 4"):
+        Graph.from_table(table, 0, 1, 2)
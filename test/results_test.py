@@ -0,0 +1,41 @@
+from protclus import MCODE, ClusterSet
+
+filename = "data/unweighted_example_network.txt"
+
+
+def test_cluster_set(tmp_path):
+    """
+    ## Testing compact cluster storage, membership lookup and binary and text export
+    """
+    c = MCODE(filename)
+    c.cluster()
+    clusters = c.cluster_set()
+    assert len(clusters) == len(c.clusters)
+    assert sorted(map(frozenset, clusters)) == sorted(map(frozenset, c.clusters))
+    assert clusters.names is c.graph.names
+    assert clusters.sizes().sum() == len(clusters.members)
+
+    protein = clusters[0][0]
+    expected = [i for i, cluster in enumerate(clusters) if protein in cluster]
+    assert clusters.clusters_of(protein).tolist() == expected
+    assert len(clusters.clusters_of("not a protein")) == 0
+
+    path = str(tmp_path / "clusters.npz")
+    clusters.save(path)
+    loaded = ClusterSet.load(path)
+    assert loaded.names == clusters.names and list(loaded) == list(clusters)
+
+    path = str(tmp_path / "clusters.txt")
+    clusters.save_text(path)
+    with open(path) as fh:
+        assert [line.split() for line in fh] == list(clusters)
+
+def test_cluster_set_from_clusters():
+    """
+    ## Testing clusters of names are interned in order of first appearance
+    """
+    clusters = ClusterSet.from_clusters([["b", "a", "b"], ("c", "a"), set()])
+    assert clusters.names == ["b", "a", "c"]
+    assert clusters.offsets.tolist() == [0, 2, 4, 4]
+    assert list(clusters) == [["b", "a"], ["a", "c"], []]
+    assert clusters.clusters_of("a").tolist() == [0, 1]